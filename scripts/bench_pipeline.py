@@ -0,0 +1,231 @@
+"""
+bench_pipeline.py -- Offline benchmark of the grading stages
+
+Generates synthetic markets (synth_markets.py) at each requested scale and
+times every grading stage on them, without touching the Kalshi API:
+
+  ingest          raw /markets dicts -> MarketColumns
+  contract_table  build_contract_table         (pandas versions, used by
+  probabilities   compute_kalshi_probabilities  the analysis tools)
+  race_pct        get_republican_win_pct
+  margins         compute_margins_and_ratings
+  contracts_np    build_contracts              (the NumPy core grade_races
+  probabilities_np compute_probability_arrays   runs on)
+  race_pct_np     compute_race_arrays
+  margins_np      compute_margin_arrays
+  grade_races     the full grading pass (the NumPy stages plus grade
+                  thresholds and record building)
+
+Each stage runs at least --repeat times on the same inputs (fast stages
+keep going until about a second has been spent); the best and median wall
+times are kept. Peak memory is measured in one extra tracemalloc run
+per stage (numpy and pandas buffers included). Results can be saved as
+JSON and later runs compared against them.
+
+Usage:
+    python scripts/bench_pipeline.py                                # 500, 5000, 100000 contracts
+    python scripts/bench_pipeline.py --sizes 500,20000 --repeat 5 --save scripts/.bench/baseline.json
+    python scripts/bench_pipeline.py --compare scripts/.bench/baseline.json --tolerance 0.15
+"""
+
+import sys
+import json
+import time
+import argparse
+import datetime
+import platform
+import statistics
+import subprocess
+import tracemalloc
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import grade_markets as gm
+import synth_markets
+
+DEFAULT_SIZES = [500, 5000, 100_000]
+AS_OF = datetime.date(2026, 3, 11)  # fixed so margins don't drift with the calendar
+MIN_STAGE_SECONDS = 1.0
+MAX_STAGE_RUNS = 200
+
+
+# ---------------------------------------------------------------------------
+# STAGES
+# ---------------------------------------------------------------------------
+def ingest(markets, kalshi_ids):
+    cols = gm.MarketColumns()
+    for event_ticker, page in markets.items():
+        cols.extend(page, event_ticker=event_ticker)
+    return cols.ordered(list(kalshi_ids["event_ticker"]))
+
+
+def stage_plan(markets, kalshi_ids):
+    """(name, thunk) for every stage, each fed the previous stage's output."""
+    columns = ingest(markets, kalshi_ids)
+    markets_df = columns.to_frame()
+    contracts = gm.build_contract_table(markets_df, kalshi_ids)
+    probs = gm.compute_kalshi_probabilities(contracts)
+    results = gm.get_republican_win_pct(probs, contracts)
+    rated = results[results["kalshi"].notna()]
+
+    race_event = gm.race_event_table(kalshi_ids)
+    contract_arrays, race_ids = gm.build_contracts(columns, race_event)
+    prob_arrays = gm.compute_probability_arrays(contract_arrays)
+    races = gm.compute_race_arrays(prob_arrays, contract_arrays, race_ids)
+    rated_arrays = races[~np.isnan(races["kalshi"])]
+
+    def grade_races():
+        return gm.grade_races(columns, kalshi_ids, {}, AS_OF, log=None)
+
+    return [
+        ("ingest", lambda: ingest(markets, kalshi_ids)),
+        ("contract_table", lambda: gm.build_contract_table(markets_df, kalshi_ids)),
+        ("probabilities", lambda: gm.compute_kalshi_probabilities(contracts)),
+        ("race_pct", lambda: gm.get_republican_win_pct(probs, contracts)),
+        ("margins", lambda: gm.compute_margins_and_ratings(rated.copy(), AS_OF)),
+        ("contracts_np", lambda: gm.build_contracts(columns, race_event)),
+        ("probabilities_np", lambda: gm.compute_probability_arrays(contract_arrays)),
+        ("race_pct_np", lambda: gm.compute_race_arrays(prob_arrays, contract_arrays, race_ids)),
+        ("margins_np", lambda: gm.compute_margin_arrays(rated_arrays.copy(), AS_OF)),
+        ("grade_races", grade_races),
+    ]
+
+
+def time_stage(func, repeat):
+    """Best and median wall time over at least `repeat` runs; fast stages keep
+    running until MIN_STAGE_SECONDS have been spent so the best time is stable."""
+    times = []
+    while len(times) < repeat or (sum(times) < MIN_STAGE_SECONDS and len(times) < MAX_STAGE_RUNS):
+        start = time.perf_counter()
+        func()
+        times.append(time.perf_counter() - start)
+    return min(times), statistics.median(times)
+
+
+def peak_memory(func):
+    """Peak traced allocation (bytes) above the starting level during func()."""
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        func()
+        return tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+
+
+def run_size(n_contracts, repeat, seed):
+    markets, kalshi_ids = synth_markets.generate(n_contracts, seed=seed)
+    stats = {}
+    for name, func in stage_plan(markets, kalshi_ids):
+        best, median = time_stage(func, repeat)
+        stats[name] = {
+            "best_s": round(best, 6),
+            "median_s": round(median, 6),
+            "peak_mb": round(peak_memory(func) / 2**20, 3),
+        }
+    return {"contracts": sum(len(p) for p in markets.values()), "races": len(kalshi_ids), "stages": stats}
+
+
+# ---------------------------------------------------------------------------
+# REPORTING
+# ---------------------------------------------------------------------------
+def environment():
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=gm.SCRIPT_DIR,
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "machine": f"{platform.system()} {platform.machine()}",
+    }
+
+
+def print_results(results):
+    print(f"{'size':>8s}  {'stage':16s} {'best ms':>10s} {'median ms':>10s} {'peak MB':>9s}")
+    for size, run in results.items():
+        for stage, s in run["stages"].items():
+            print(f"{size:>8s}  {stage:16s} {1000 * s['best_s']:10.2f} {1000 * s['median_s']:10.2f} {s['peak_mb']:9.2f}")
+
+
+def compare(results, baseline, tolerance):
+    """Print current/baseline ratios; returns the (size, stage, metric) regressions."""
+    regressions = []
+    print(f"\nvs baseline {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')}):")
+    print(f"{'size':>8s}  {'stage':16s} {'time x':>8s} {'memory x':>9s}")
+    for size, run in results.items():
+        base_run = baseline["results"].get(size)
+        if base_run is None:
+            continue
+        for stage, s in run["stages"].items():
+            b = base_run["stages"].get(stage)
+            if b is None:
+                continue
+            t_ratio = s["best_s"] / b["best_s"] if b["best_s"] else float("nan")
+            m_ratio = s["peak_mb"] / b["peak_mb"] if b["peak_mb"] else float("nan")
+            flags = []
+            if t_ratio > 1 + tolerance:
+                flags.append("SLOWER")
+                regressions.append((size, stage, "time"))
+            if m_ratio > 1 + tolerance:
+                flags.append("MORE MEMORY")
+                regressions.append((size, stage, "memory"))
+            print(f"{size:>8s}  {stage:16s} {t_ratio:8.2f} {m_ratio:9.2f}  {' '.join(flags)}")
+    return regressions
+
+
+# ---------------------------------------------------------------------------
+# MAIN
+# ---------------------------------------------------------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the grading stages on synthetic markets")
+    parser.add_argument(
+        "--sizes", default=",".join(map(str, DEFAULT_SIZES)),
+        help="comma-separated contract counts (default 500,5000,100000)",
+    )
+    parser.add_argument("--repeat", type=int, default=3, help="minimum timed runs per stage (default 3)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", type=Path, help="write results JSON here")
+    parser.add_argument("--compare", type=Path, help="baseline results JSON to compare against")
+    parser.add_argument(
+        "--tolerance", type=float, default=0.15,
+        help="fractional slowdown/memory growth flagged as a regression (default 0.15)",
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sizes = [int(s) for s in args.sizes.split(",") if s]
+
+    results = {}
+    for n in sizes:
+        print(f"Benchmarking {n} contracts...", file=sys.stderr)
+        results[str(n)] = run_size(n, args.repeat, args.seed)
+    report = {"meta": {**environment(), "repeat": args.repeat, "seed": args.seed}, "results": results}
+
+    print_results(results)
+    if args.save:
+        args.save.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"\nSaved results to {args.save}")
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        regressions = compare(results, baseline, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.tolerance:.0%}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""
+compare_ratings.py -- Compare our market grades against outside race ratings
+
+Reference ratings live as data files in scripts/ratings/ (one CSV per
+source with race_id,rating columns; the file stem is the source name).
+Each source is joined against every dated grades file in src/data/grades/
+across all chambers, and for every date and chamber we report:
+
+  - a confusion matrix (source rating x our rating, plus an Unrated column
+    for races we have no margin for)
+  - exact and within-one-category agreement
+  - mean absolute category deviation and mean signed deviation (bias,
+    positive = our rating is more Republican than the source)
+
+All dates are scored at once: ratings are encoded on the -3..+3 scale and
+the (date, source rating, our rating) triples are counted with a single
+bincount, from which every metric is derived.
+
+Usage:
+    python scripts/compare_ratings.py                   # every source in scripts/ratings/
+    python scripts/compare_ratings.py --source scripts/ratings/cook.csv --chamber House
+    python scripts/compare_ratings.py --json report.json --csv agreement.csv
+    python scripts/compare_ratings.py --date 2026-03-01  # detail for one day
+"""
+
+import sys
+import csv
+import json
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+import grade_markets as gm
+
+# ---------------------------------------------------------------------------
+# CONFIG
+# ---------------------------------------------------------------------------
+RATINGS_DIR = gm.SCRIPT_DIR / "ratings"
+
+CATEGORIES = ["Solid D", "Likely D", "Lean D", "Tossup", "Lean R", "Likely R", "Solid R"]
+CATEGORY_CODES = {label: i for i, label in enumerate(CATEGORIES)}
+CATEGORY_CODES["Toss Up"] = CATEGORY_CODES["Tossup"]
+N_CAT = len(CATEGORIES)
+
+# Codes in the grades matrix beyond the rating categories
+UNRATED = N_CAT   # race is in the grades file but has no rating
+ABSENT = -1       # race is not in that day's grades file (or not rated by the source)
+
+# Signed deviation (ours - source) for every cell of the rated block
+_CAT = np.arange(N_CAT)
+DEVIATION = _CAT[None, :] - _CAT[:, None]
+
+
+# ---------------------------------------------------------------------------
+# LOADING
+# ---------------------------------------------------------------------------
+def source_paths(paths=None):
+    """Reference CSVs to compare against: the given files, or everything in ratings/."""
+    if paths:
+        return [Path(p) for p in paths]
+    return sorted(RATINGS_DIR.glob("*.csv"))
+
+
+def load_source(path):
+    """{race_id: category code} from a race_id,rating CSV. Unknown labels are an error."""
+    ratings = {}
+    with open(path, newline="") as f:
+        for row in csv.DictReader(f):
+            label = (row.get("rating") or "").strip()
+            if not label:
+                continue
+            if label not in CATEGORY_CODES:
+                sys.exit(f"{path}: unknown rating {label!r} for {row['race_id']}")
+            ratings[row["race_id"]] = CATEGORY_CODES[label]
+    return ratings
+
+
+def load_grades_history(grades_dir):
+    """Every dated grades file as one (date x race) code matrix.
+
+    Returns (dates, race_ids, codes, records) where codes[d, r] is the
+    category code of race r on date d, UNRATED if it was graded without a
+    rating, or ABSENT if it was not in that day's file. records maps
+    date -> {race_id: race record} for the per-race detail output.
+    """
+    paths = sorted(p for p in Path(grades_dir).iterdir() if gm.DATED_GRADES_FILE.match(p.name))
+    if not paths:
+        sys.exit(f"No dated grades files in {grades_dir}")
+
+    dates, records = [], {}
+    for path in paths:
+        with open(path) as f:
+            data = json.load(f)
+        dates.append(path.stem)
+        records[path.stem] = {r["race_id"]: r for r in data["races"]}
+
+    race_ids = np.array(sorted(set().union(*records.values())))
+    column = {rid: i for i, rid in enumerate(race_ids)}
+    codes = np.full((len(dates), len(race_ids)), ABSENT, dtype=np.int8)
+    for d, date in enumerate(dates):
+        day = records[date]
+        cols = np.fromiter((column[rid] for rid in day), dtype=np.intp, count=len(day))
+        codes[d, cols] = [CATEGORY_CODES.get(r["rating"], UNRATED) for r in day.values()]
+    return dates, race_ids, codes, records
+
+
+def chamber_of(race_ids):
+    """Chamber name for each race_id, from its prefix letter."""
+    prefixes = np.array([rid[0] for rid in race_ids])
+    return np.array([gm.CHAMBER_NAMES.get(p, p) for p in prefixes])
+
+
+# ---------------------------------------------------------------------------
+# COMPARISON
+# ---------------------------------------------------------------------------
+def confusion_matrices(reference, codes):
+    """(dates x N_CAT x N_CAT+1) counts of (source rating, our rating) per date.
+
+    reference is the source's code for each race column (ABSENT if the
+    source does not rate it); codes is the grades matrix for the same columns.
+    """
+    n_dates = codes.shape[0]
+    ref = np.broadcast_to(reference, codes.shape)
+    mask = (ref != ABSENT) & (codes != ABSENT)
+    day = np.broadcast_to(np.arange(n_dates)[:, None], codes.shape)
+    cells = (day[mask] * N_CAT + ref[mask]) * (N_CAT + 1) + codes[mask]
+    counts = np.bincount(cells, minlength=n_dates * N_CAT * (N_CAT + 1))
+    return counts.reshape(n_dates, N_CAT, N_CAT + 1)
+
+
+def agreement_series(confusion):
+    """Per-date agreement metrics derived from the confusion matrices."""
+    rated_block = confusion[:, :, :N_CAT]
+    compared = confusion.sum(axis=(1, 2))
+    rated = rated_block.sum(axis=(1, 2))
+    exact = np.trace(rated_block, axis1=1, axis2=2)
+    within_one = (rated_block * (np.abs(DEVIATION) <= 1)).sum(axis=(1, 2))
+    abs_dev = (rated_block * np.abs(DEVIATION)).sum(axis=(1, 2))
+    signed_dev = (rated_block * DEVIATION).sum(axis=(1, 2))
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return {
+            "compared": compared,
+            "rated": rated,
+            "unrated": compared - rated,
+            "exact_pct": exact / rated,
+            "within_one_pct": within_one / rated,
+            "mean_abs_dev": abs_dev / rated,
+            "bias": signed_dev / rated,
+        }
+
+
+def deviations(reference, codes_row, race_ids, day_records):
+    """Races on one date where our rating differs from the source, biggest first."""
+    rated = (reference != ABSENT) & (codes_row != ABSENT)
+    differs = rated & (reference != codes_row)
+    out = []
+    for i in np.flatnonzero(differs):
+        rec = day_records[race_ids[i]]
+        ours = int(codes_row[i])
+        diff = None if ours == UNRATED else ours - int(reference[i])
+        out.append({
+            "race_id": str(race_ids[i]),
+            "label": rec["label"],
+            "chamber": rec["chamber"],
+            "source": CATEGORIES[reference[i]],
+            "ours": rec["rating"],
+            "grade": rec["grade"],
+            "margin": rec["margin"],
+            "diff": diff,
+        })
+    out.sort(key=lambda d: (d["diff"] is None, -abs(d["diff"] or 0), d["race_id"]))
+    return out
+
+
+def compare_source(ratings, dates, race_ids, codes, records, detail_date, chamber=None):
+    """Full report for one reference source, overall and per chamber."""
+    chambers = chamber_of(race_ids)
+    reference = np.array([ratings.get(rid, ABSENT) for rid in race_ids], dtype=np.int8)
+    if chamber:
+        reference = np.where(chambers == chamber, reference, ABSENT).astype(np.int8)
+    d = dates.index(detail_date)
+
+    groups = {"All": np.ones(len(race_ids), dtype=bool)}
+    for name in np.unique(chambers[reference != ABSENT]):
+        groups[str(name)] = chambers == name
+
+    report = {
+        "source_races": len(ratings),
+        "matched_races": int((reference != ABSENT).sum()),
+        "detail_date": detail_date,
+        "chambers": {},
+    }
+    for name, cols in groups.items():
+        confusion = confusion_matrices(reference[cols], codes[:, cols])
+        series = agreement_series(confusion)
+        report["chambers"][name] = {
+            "series": [
+                {"date": date, **{k: _plain(v[i]) for k, v in series.items()}}
+                for i, date in enumerate(dates)
+            ],
+            "confusion": confusion[d].tolist(),
+        }
+    report["deviations"] = deviations(reference, codes[d], race_ids, records[detail_date])
+    return report
+
+
+def _plain(value):
+    """NumPy scalar -> JSON-friendly int/float (NaN -> None)."""
+    if isinstance(value, np.integer):
+        return int(value)
+    value = float(value)
+    return None if np.isnan(value) else round(value, 4)
+
+
+# ---------------------------------------------------------------------------
+# OUTPUT
+# ---------------------------------------------------------------------------
+def _pct(value):
+    return "   n/a" if value is None else f"{100 * value:5.1f}%"
+
+
+def print_report(name, report):
+    """Human-readable summary of one source's comparison."""
+    date = report["detail_date"]
+    print(f"=== {name.upper()} vs MARKET GRADES ({date}) ===")
+    print(f"Source races: {report['source_races']}  matched to our races: {report['matched_races']}\n")
+
+    for chamber, block in report["chambers"].items():
+        row = next(r for r in block["series"] if r["date"] == date)
+        mad = "n/a" if row["mean_abs_dev"] is None else f"{row['mean_abs_dev']:.2f}"
+        bias = "n/a" if row["bias"] is None else f"{row['bias']:+.2f}"
+        print(
+            f"  {chamber:10s} compared {row['compared']:4d}  unrated {row['unrated']:3d}  "
+            f"exact {_pct(row['exact_pct'])}  within 1 {_pct(row['within_one_pct'])}  "
+            f"MAD {mad}  bias {bias}"
+        )
+
+    confusion = np.array(report["chambers"]["All"]["confusion"])
+    short = ["SD", "LkD", "LnD", "TU", "LnR", "LkR", "SR", "N/A"]
+    print(f"\n--- CONFUSION (rows: {name}, columns: ours) ---")
+    print("          " + "".join(f"{s:>6s}" for s in short))
+    for i, label in enumerate(CATEGORIES):
+        print(f"  {label:8s}" + "".join(f"{n:6d}" for n in confusion[i]))
+
+    devs = report["deviations"]
+    for title, picked in [
+        ("BIG DEVIATIONS (2+ categories off)", [x for x in devs if x["diff"] is not None and abs(x["diff"]) >= 2]),
+        ("SMALL DEVIATIONS (1 category off)", [x for x in devs if x["diff"] is not None and abs(x["diff"]) == 1]),
+        ("UNRATED BY US", [x for x in devs if x["diff"] is None]),
+    ]:
+        print(f"\n--- {title} ---")
+        for x in picked:
+            direction = "" if x["diff"] is None else ("  [more R]" if x["diff"] > 0 else "  [more D]")
+            m = x["margin"] if x["margin"] is not None else 0
+            print(
+                f"  {x['label']:14s}  {name}: {x['source']:9s}  Ours: {x['ours'] or 'N/A':9s}  "
+                f"(grade {x['grade']}, margin {m:+d}){direction}"
+            )
+
+    print("\n--- AGREEMENT OVER TIME (All) ---")
+    for row in report["chambers"]["All"]["series"]:
+        if row["compared"]:
+            mad = "  n/a" if row["mean_abs_dev"] is None else f"{row['mean_abs_dev']:.2f}"
+            print(f"  {row['date']}  n={row['compared']:4d}  exact {_pct(row['exact_pct'])}  MAD {mad}")
+    print()
+
+
+def write_json(reports, path):
+    payload = {
+        "categories": CATEGORIES,
+        "our_columns": CATEGORIES + ["Unrated"],
+        "sources": reports,
+    }
+    with open(path, "w") as f:
+        json.dump(payload, f, indent=2)
+
+
+def write_csv(reports, path):
+    """Long-format agreement time series: one row per source, chamber and date."""
+    fields = ["source", "chamber", "date", "compared", "rated", "unrated",
+              "exact_pct", "within_one_pct", "mean_abs_dev", "bias"]
+    with open(path, "w", newline="") as f:
+        writer = csv.DictWriter(f, fieldnames=fields)
+        writer.writeheader()
+        for name, report in reports.items():
+            for chamber, block in report["chambers"].items():
+                for row in block["series"]:
+                    writer.writerow({"source": name, "chamber": chamber, **row})
+
+
+# ---------------------------------------------------------------------------
+# MAIN
+# ---------------------------------------------------------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Compare market grades against reference race ratings")
+    parser.add_argument(
+        "--source", action="append", type=Path, metavar="CSV",
+        help="race_id,rating CSV to compare against (repeatable; default: every file in scripts/ratings/)",
+    )
+    parser.add_argument("--grades-dir", type=Path, default=gm.OUTPUT_DIR, help="default src/data/grades")
+    parser.add_argument("--chamber", choices=sorted(set(gm.CHAMBER_NAMES.values())), help="restrict to one chamber")
+    parser.add_argument("--date", help="grades date for the confusion matrix and deviations (default: latest)")
+    parser.add_argument("--json", type=Path, help="write the full report as JSON")
+    parser.add_argument("--csv", type=Path, help="write the agreement time series as CSV")
+    parser.add_argument("--quiet", action="store_true", help="skip the printed summary")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    sources = source_paths(args.source)
+    if not sources:
+        sys.exit(f"No rating sources found in {RATINGS_DIR}")
+
+    dates, race_ids, codes, records = load_grades_history(args.grades_dir)
+    detail_date = args.date or dates[-1]
+    if detail_date not in dates:
+        sys.exit(f"No grades file for {detail_date}")
+
+    reports = {}
+    for path in sources:
+        ratings = load_source(path)
+        reports[path.stem] = compare_source(
+            ratings, dates, race_ids, codes, records, detail_date, chamber=args.chamber,
+        )
+        if not args.quiet:
+            print_report(path.stem, reports[path.stem])
+
+    if args.json:
+        write_json(reports, args.json)
+        print(f"Wrote {args.json}")
+    if args.csv:
+        write_csv(reports, args.csv)
+        print(f"Wrote {args.csv}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+grades_api.py -- Prebuilt /api/grades responses
+
+/api/grades serves prebuilt files instead of parsing the grades JSON per
+request. For every dated grades file grade_markets.py writes, this module
+writes, under <grades dir>/api/<date>/:
+
+  all.{json,txt,csv}                 every race
+  chamber-<house|senate|governor>.*  one chamber
+  state-<XX>.*                       one state
+
+each with a .gz twin, plus dates.{json,txt} (the ?dates manifest) and the
+same slices of latest.json under api/latest/. The JSON bodies are
+byte-identical to what the route builds with NextResponse.json, the .txt
+bodies to its ASCII table and the .csv bodies to its CSV. Only the newest
+API_ARTIFACT_DAYS dates keep artifacts; for older dates, for
+grade/min_liquidity/race filters and whenever the artifacts are missing
+the route falls back to parsing the grades file.
+
+The artifacts are build output, not data: api/ is gitignored and npm's
+prebuild step runs this script before `next build`. It needs nothing but
+python3 and its standard library, so any machine that builds the site can
+build the artifacts, and a failure here fails the build rather than
+silently shipping a site that parses grades on every request.
+
+Usage:
+    python3 scripts/grades_api.py [--grades-dir DIR]
+"""
+
+import io
+import re
+import csv
+import gzip
+import json
+import shutil
+import decimal
+import argparse
+from pathlib import Path
+
+# ---------------------------------------------------------------------------
+# CONFIG
+# ---------------------------------------------------------------------------
+SCRIPT_DIR = Path(__file__).resolve().parent
+PROJECT_ROOT = SCRIPT_DIR.parent
+GRADES_DIR = PROJECT_ROOT / "src" / "data" / "grades"
+
+API_ARTIFACT_DAYS = 7
+API_CSV_FIELDS = [
+    "race_id", "event_ticker", "kalshi_url", "chamber", "state", "state_name", "label",
+    "grade", "liquidity_score", "volume_pct", "spread_pct", "oi_pct", "rating", "margin",
+]
+DATED_GRADES_FILE = re.compile(r"^\d{4}-\d{2}-\d{2}\.json$")
+_TABLE_WIDTHS = {"race": 14, "grade": 5, "liq": 12, "vol": 5, "spr": 5, "oi": 5}
+
+
+# ---------------------------------------------------------------------------
+# RENDERERS
+# ---------------------------------------------------------------------------
+def _js_fixed(x, digits):
+    """Number.prototype.toFixed: exact binary value, ties away from zero."""
+    q = decimal.Decimal(1).scaleb(-digits)
+    return str(decimal.Decimal(x or 0).quantize(q, rounding=decimal.ROUND_HALF_UP))
+
+
+def _js_number(value):
+    # JSON.stringify writes integral floats without the ".0"
+    return int(value) if isinstance(value, float) and value.is_integer() else value
+
+
+def render_json(body):
+    """Compact JSON matching JSON.stringify for grades payloads."""
+    if "races" in body:
+        body = {**body, "races": [{k: _js_number(v) for k, v in r.items()} for r in body["races"]]}
+    return json.dumps(body, separators=(",", ":"), ensure_ascii=False)
+
+
+def _grade_bar(score):
+    filled = int(_js_fixed(score * 10, 0))
+    return "█" * filled + "░" * (10 - filled)
+
+
+def _pct_cell(race, field):
+    # (x * 100).toFixed(0) in JS: null renders as 0, a missing field as NaN
+    if field not in race:
+        return "NaN"
+    return _js_fixed((race[field] or 0) * 100, 0)
+
+
+def _race_label(race):
+    return f"{race['state']}-{race['label']}" if race["chamber"] == "House" else race["label"]
+
+
+def render_table(races, date):
+    """ASCII table for ?format=table (mirror of formatTable in route.ts)."""
+    w = _TABLE_WIDTHS
+    plural = "s" if len(races) != 1 else ""
+    lines = ["", "  THE HEAT SHEET — Market Grades", f"  {date}                {len(races)} race{plural}", ""]
+    if not races:
+        lines += ["  No races match your filters.", ""]
+        return "\n".join(lines)
+
+    def border(left, join, right):
+        return "  " + left + join.join("─" * (n + 2) for n in w.values()) + right
+
+    def row(race, grade, liq, vol, spr, oi):
+        return (
+            f"  │ {race[:w['race']]:<{w['race']}} │ {grade[:w['grade']]:<{w['grade']}}"
+            f" │ {liq[:w['liq']]:<{w['liq']}} │ {vol[:w['vol']]:>{w['vol']}}"
+            f" │ {spr[:w['spr']]:>{w['spr']}} │ {oi[:w['oi']]:>{w['oi']}} │"
+        )
+
+    lines.append(border("┌", "┬", "┐"))
+    lines.append(row("Race", "Grade", "Liquidity", "Vol", "Spr", "OI"))
+    lines.append(border("├", "┼", "┤"))
+    for r in races:
+        lines.append(row(
+            _race_label(r), r["grade"], _grade_bar(r["liquidity_score"]),
+            _pct_cell(r, "volume_pct"), _pct_cell(r, "spread_pct"), _pct_cell(r, "oi_pct"),
+        ))
+    lines.append(border("└", "┴", "┘"))
+    lines += ["", "  Vol/Spr/OI = percentile (0-100). Liquidity = composite score.", ""]
+    return "\n".join(lines)
+
+
+def render_csv(races):
+    buf = io.StringIO()
+    writer = csv.DictWriter(buf, fieldnames=API_CSV_FIELDS, extrasaction="ignore", lineterminator="\n")
+    writer.writeheader()
+    writer.writerows({k: _js_number(v) for k, v in r.items()} for r in races)
+    return buf.getvalue()
+
+
+def render_dates_table(dates):
+    return "\n  Available dates:\n\n" + "\n".join(f"    {d}" for d in dates) + "\n"
+
+
+# ---------------------------------------------------------------------------
+# ARTIFACTS
+# ---------------------------------------------------------------------------
+def api_slices(races):
+    """(name, races) for the unfiltered list and every chamber and state."""
+    slices = {"all": races}
+    for r in races:
+        slices.setdefault(f"chamber-{r['chamber'].lower()}", []).append(r)
+    for r in races:
+        slices.setdefault(f"state-{r['state']}", []).append(r)
+    return slices.items()
+
+
+def _write_api_file(path, text):
+    data = text.encode()
+    write_atomic(path, data)
+    write_atomic(path.with_name(path.name + ".gz"), gzip.compress(data, mtime=0))
+
+
+def write_api_artifacts(output, output_dir=None, name=None):
+    """Prebuild every /api/grades response body for one grades payload,
+    under api/<name> (default: its date)."""
+    api_dir = Path(output_dir or GRADES_DIR) / "api"
+    date = output["date"]
+    date_dir = api_dir / (name or date)
+    if date_dir.is_symlink():  # api/latest used to be a symlink to a date
+        date_dir.unlink()
+    date_dir.mkdir(parents=True, exist_ok=True)
+    for slice_name, races in api_slices(output["races"]):
+        body = {"date": date, "total": len(races), "races": races}
+        _write_api_file(date_dir / f"{slice_name}.json", render_json(body))
+        _write_api_file(date_dir / f"{slice_name}.txt", render_table(races, date))
+        _write_api_file(date_dir / f"{slice_name}.csv", render_csv(races))
+
+    grades_dir = api_dir.parent
+    dates = sorted((p.stem for p in grades_dir.iterdir() if DATED_GRADES_FILE.match(p.name)), reverse=True)
+    _write_api_file(api_dir / "dates.json", render_json({"available_dates": dates}))
+    _write_api_file(api_dir / "dates.txt", render_dates_table(dates))
+    for stale in dates[API_ARTIFACT_DAYS:]:
+        if (api_dir / stale).is_dir():
+            shutil.rmtree(api_dir / stale)
+    return date_dir
+
+
+def build_api_artifacts(grades_dir=None):
+    """(Re)build the API artifacts for latest.json and the newest
+    API_ARTIFACT_DAYS dated grades files."""
+    grades_dir = Path(grades_dir or GRADES_DIR)
+    paths = sorted(p for p in grades_dir.iterdir() if DATED_GRADES_FILE.match(p.name))
+    for path in paths[-API_ARTIFACT_DAYS:]:
+        write_api_artifacts(read_grades(path), grades_dir)
+        print(f"  {path.name} -> api/{path.stem}/")
+    latest = read_grades(grades_dir / "latest.json")
+    if latest is not None:
+        write_api_artifacts(latest, grades_dir, "latest")
+        print("  latest.json -> api/latest/")
+
+
+# ---------------------------------------------------------------------------
+# FILES
+# ---------------------------------------------------------------------------
+def write_atomic(path, data):
+    """Write str or bytes via a temp file and rename, so readers never see a
+    partial file."""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_bytes(data.encode() if isinstance(data, str) else data)
+    tmp.replace(path)
+
+
+def read_grades(path):
+    """A grades payload from disk, or None if the file does not exist."""
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Prebuild the /api/grades responses")
+    parser.add_argument(
+        "--grades-dir", type=Path, default=GRADES_DIR,
+        help="grades directory to build api/ in (default src/data/grades)",
+    )
+    args = parser.parse_args(argv)
+    print(f"Building API artifacts in {args.grades_dir / 'api'}...")
+    build_api_artifacts(args.grades_dir)
+
+
+if __name__ == "__main__":
+    main()
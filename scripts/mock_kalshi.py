@@ -0,0 +1,542 @@
+"""
+mock_kalshi.py -- Local Kalshi API stand-in for fetch-layer testing
+
+Serves /trade-api/v2/markets (event_ticker / series_ticker filters, cursor
+paging), /trade-api/v2/markets/{ticker}/orderbook (synthetic books around
+each contract's quotes), /trade-api/v2/series/{series}/markets/{ticker}/candlesticks
+(a synthetic price path around each traded contract's last price) and
+/trade-api/v2/series/{ticker} from synthetic markets
+(synth_markets.py), a saved fixture directory, or a recorded snapshot, with
+injectable faults:
+
+  latency       per-request delay, mean plus uniform jitter
+  error rate    share of requests answered with a 503
+  rate limit    server-side token bucket; over-limit requests get 429 + Retry-After
+  429 storms    every --storm-every seconds, --storm-for seconds of nothing but 429s
+  truncation    share of /markets pages that say has_more but carry no cursor
+  slow series   extra delay on every /series lookup
+
+`serve` runs it standalone. `bench` starts it in-process, points
+grade_markets at it, runs the full pull (bulk series pages, per-event
+fallback, series URL lookups) and reports end-to-end fetch time,
+throughput, retries and how many contracts actually arrived (--depth adds
+the order-book pass for two-sided contracts, --candles a price-history
+backfill followed by a one-period incremental update).
+
+Usage:
+    python scripts/mock_kalshi.py serve --contracts 5000 --port 8765 --latency 0.05
+    python scripts/mock_kalshi.py bench --contracts 5000 --rate-limit 20 --error-rate 0.02
+    python scripts/mock_kalshi.py bench --snapshot src/data/snapshots/2026-03-11T1200Z.npz --storm-every 5 --storm-for 2
+    python scripts/mock_kalshi.py bench --fixture /tmp/synth --truncate-rate 0.05 --series-latency 0.5
+    python scripts/mock_kalshi.py bench --contracts 5000 --depth --latency 0.02
+    python scripts/mock_kalshi.py bench --contracts 2000 --candles
+"""
+
+import io
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import threading
+import contextlib
+import urllib.parse
+from pathlib import Path
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import numpy as np
+import pandas as pd
+
+import grade_markets as gm
+import synth_markets
+
+API_PREFIX = "/trade-api/v2"
+DEFAULT_PAGE_SIZE = 1000  # Kalshi's /markets page cap
+DEFAULT_RETRY_AFTER = 1  # seconds advertised on rate-limit 429s
+BOOK_LEVELS = 8  # price levels per side in synthetic order books
+
+
+# ---------------------------------------------------------------------------
+# DATA
+# ---------------------------------------------------------------------------
+def load_fixture(path):
+    """(markets, kalshi_ids) from a synth_markets.py output directory."""
+    path = Path(path)
+    with open(path / "markets.json") as f:
+        markets = json.load(f)
+    return markets, pd.read_csv(path / "kalshi_ids.csv")
+
+
+def snapshot_markets(path):
+    """(markets, kalshi_ids) rebuilt from a recorded .npz snapshot: the
+    archived contracts as /markets records grouped by event ticker."""
+    columns, race_event, _, _ = gm.load_snapshot(path)
+    markets = {et: [] for et in dict.fromkeys(race_event["event_ticker"])}
+    for record in columns.records():
+        record["status"] = "active"
+        markets.setdefault(record["event_ticker"], []).append(record)
+    return markets, pd.DataFrame(race_event)
+
+
+class _Bucket:
+    """Non-blocking token bucket: take() returns 0 when a token was taken,
+    else the seconds until one is available."""
+
+    def __init__(self, rate):
+        self.rate = float(rate)
+        self.capacity = max(1.0, self.rate)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def take(self):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return 0.0
+            return (1 - self._tokens) / self.rate
+
+
+# ---------------------------------------------------------------------------
+# SERVER
+# ---------------------------------------------------------------------------
+class MockKalshi:
+    """Threaded HTTP server replaying `markets` ({event_ticker: [record]})
+    with the configured faults. Use as a context manager or call start()/stop()."""
+
+    def __init__(self, markets, host="127.0.0.1", port=0, page_size=DEFAULT_PAGE_SIZE,
+                 latency=0.0, jitter=0.0, error_rate=0.0, rate_limit=None,
+                 storm_every=0.0, storm_for=0.0, truncate_rate=0.0,
+                 series_latency=0.0, seed=0):
+        self.markets = markets
+        self.by_series = {}
+        for et, records in markets.items():
+            self.by_series.setdefault(gm.series_ticker_for(et), []).extend(records)
+        self.by_ticker = {m["ticker"]: m for records in markets.values() for m in records}
+        self.series_titles = {
+            gm.url_series_ticker(et): f"{gm.url_series_ticker(et)} 2026" for et in markets
+        }
+        self.page_size = page_size
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.bucket = _Bucket(rate_limit) if rate_limit else None
+        self.storm_every = storm_every
+        self.storm_for = storm_for
+        self.truncate_rate = truncate_rate
+        self.series_latency = series_latency
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.reset_stats()
+
+        self.httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self.httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}{API_PREFIX}"
+
+    def start(self):
+        self._started = time.monotonic()
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # -- stats ---------------------------------------------------------------
+    def reset_stats(self):
+        with self._lock:
+            self._started = time.monotonic()
+            self._seen = set()
+            self.stats = {
+                "requests": 0, "retries": 0, "status": {},
+                "endpoints": {}, "truncated_pages": 0,
+            }
+
+    def _record(self, endpoint, key, status):
+        now = time.monotonic() - self._started
+        with self._lock:
+            s = self.stats
+            s["requests"] += 1
+            if key in self._seen:
+                s["retries"] += 1
+            self._seen.add(key)
+            s["status"][str(status)] = s["status"].get(str(status), 0) + 1
+            ep = s["endpoints"].setdefault(endpoint, {"requests": 0, "first_s": now, "last_s": now})
+            ep["requests"] += 1
+            ep["last_s"] = now
+
+    def _chance(self, p):
+        if p <= 0:
+            return False
+        with self._lock:
+            return self._rng.random() < p
+
+    # -- faults --------------------------------------------------------------
+    def _delay(self, endpoint):
+        delay = self.latency
+        if self.jitter:
+            with self._lock:
+                delay += self._rng.uniform(-self.jitter, self.jitter)
+        if endpoint == "series":
+            delay += self.series_latency
+        if delay > 0:
+            time.sleep(delay)
+
+    def _throttle(self):
+        """Seconds the client should wait if this request is rate limited, else None."""
+        if self.storm_every and self.storm_for:
+            phase = (time.monotonic() - self._started) % self.storm_every
+            if phase >= self.storm_every - self.storm_for:
+                return self.storm_every - phase
+        if self.bucket:
+            wait = self.bucket.take()
+            if wait:
+                return max(wait, DEFAULT_RETRY_AFTER)
+        return None
+
+    # -- endpoints -----------------------------------------------------------
+    def markets_page(self, query):
+        if "event_ticker" in query:
+            items = self.markets.get(query["event_ticker"], [])
+        elif "series_ticker" in query:
+            items = self.by_series.get(query["series_ticker"], [])
+        else:
+            items = [m for records in self.markets.values() for m in records]
+        start = int(query.get("cursor") or 0)
+        limit = min(int(query.get("limit", self.page_size)), self.page_size)
+        end = start + limit
+        body = {"markets": [dict(m) for m in items[start:end]], "cursor": ""}
+        if end < len(items):
+            if self._chance(self.truncate_rate):
+                with self._lock:
+                    self.stats["truncated_pages"] += 1
+                body["has_more"] = True
+            else:
+                body["cursor"] = str(end)
+        return 200, body
+
+    def orderbook(self, ticker):
+        """Resting YES and NO bids stepping down from the contract's quotes,
+        sizes seeded by the ticker so every request sees the same book."""
+        m = self.by_ticker.get(ticker)
+        if m is None:
+            return 404, {"error": {"code": "not_found", "message": "market not found"}}
+        rng = random.Random(ticker)
+        book = {}
+        for side, best in (("yes", m["yes_bid"]), ("no", 100 - m["yes_ask"] if m["yes_ask"] else 0)):
+            if best > 0:
+                levels = [[p, rng.randint(1, 500)] for p in range(best, max(0, best - BOOK_LEVELS), -1)]
+                book[side] = levels[::-1]  # ascending price, as Kalshi sends them
+            else:
+                book[side] = None
+        return 200, {"orderbook": book}
+
+    def candlesticks(self, ticker, query):
+        """Candles for every period ending in [start_ts, end_ts]; each one is
+        seeded by ticker and period, so overlapping requests agree."""
+        m = self.by_ticker.get(ticker)
+        if m is None:
+            return 404, {"error": {"code": "not_found", "message": "market not found"}}
+        period = int(query.get("period_interval", 60)) * 60
+        start, end = int(query["start_ts"]), int(query["end_ts"])
+        candles = []
+        if m["volume"]:
+            base = m["last_price"] or 50
+            for ts in range(-(-start // period) * period, end + 1, period):
+                rng = random.Random(f"{ticker}:{ts}")
+                volume = rng.choice([0, 0, rng.randint(1, 500)])
+                close = min(99, max(1, base + rng.randint(-4, 4)))
+                mean = min(99, max(1, close + rng.randint(-2, 2)))
+                candles.append({
+                    "end_period_ts": ts,
+                    "volume": volume,
+                    "open_interest": m["open_interest"],
+                    "price": {"close": close if volume else None, "mean": mean if volume else None},
+                })
+        return 200, {"ticker": ticker, "candlesticks": candles}
+
+    def series(self, ticker):
+        title = self.series_titles.get(ticker)
+        if title is None:
+            return 404, {"error": {"code": "not_found", "message": "series not found"}}
+        return 200, {"series": {"ticker": ticker, "title": title}}
+
+    def handle(self, path, query):
+        """(status, body, headers) for a GET; applies every fault first."""
+        if path.endswith("/candlesticks"):
+            endpoint = "candles"
+        elif path.startswith("/series/"):
+            endpoint = "series"
+        elif path == "/markets":
+            endpoint = "markets"
+        elif path.startswith("/markets/") and path.endswith("/orderbook"):
+            endpoint = "orderbook"
+        else:
+            endpoint = "other"
+        self._delay(endpoint)
+        retry_after = self._throttle()
+        if retry_after is not None:
+            status, body = 429, {"error": {"code": "too_many_requests", "message": "rate limited"}}
+            headers = {"Retry-After": str(max(1, round(retry_after)))}
+        elif self._chance(self.error_rate):
+            status, body, headers = 503, {"error": {"code": "unavailable", "message": "injected"}}, {}
+        elif endpoint == "markets":
+            (status, body), headers = self.markets_page(query), {}
+        elif endpoint == "candles":
+            (status, body), headers = self.candlesticks(path.split("/")[4], query), {}
+        elif endpoint == "orderbook":
+            (status, body), headers = self.orderbook(path.split("/")[2]), {}
+        elif endpoint == "series":
+            (status, body), headers = self.series(path.rsplit("/", 1)[1]), {}
+        else:
+            status, body, headers = 404, {"error": {"code": "not_found", "message": path}}, {}
+        return status, body, headers, endpoint
+
+    def _handler_class(self):
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # keep-alive, like the real API
+
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                parsed = urllib.parse.urlsplit(self.path)
+                path = parsed.path[len(API_PREFIX):] if parsed.path.startswith(API_PREFIX) else parsed.path
+                query = dict(urllib.parse.parse_qsl(parsed.query))
+                status, body, headers, endpoint = mock.handle(path, query)
+                mock._record(endpoint, self.path, status)
+                data = json.dumps(body, separators=(",", ":")).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+        return Handler
+
+
+# ---------------------------------------------------------------------------
+# HARNESS
+# ---------------------------------------------------------------------------
+def run_fetch(mock, kalshi_ids, workers, bulk=True, client_rate=None, client_max_rate=None,
+              depth=False, candles=False):
+    """Run gm.pull_all_markets (then gm.add_book_depth if `depth`, and
+    gm.add_price_history twice, a backfill and an update one period later,
+    if `candles`) against the mock; returns the report dict.
+
+    The series cache, pull checkpoint, order-book and candle caches live in a throwaway directory so
+    every run does the full set of fetches, and the shared session and
+    adaptive limiter are rebuilt (starting at client_rate, capped at
+    client_max_rate; grade_markets' defaults otherwise).
+    """
+    saved = (gm.BASE_URL, gm.SERIES_CACHE_PATH, gm.PULL_CHECKPOINT_PATH, gm.ORDERBOOK_CACHE_PATH,
+             gm.CANDLE_CACHE_PATH, gm._rate_limiter, gm._session)
+    books = history = None
+    expected = sum(len(mock.markets.get(et, [])) for et in kalshi_ids["event_ticker"].unique())
+    with tempfile.TemporaryDirectory() as tmp:
+        gm.BASE_URL = mock.url
+        gm.SERIES_CACHE_PATH = Path(tmp) / "series.json"
+        gm.PULL_CHECKPOINT_PATH = Path(tmp) / "pull_checkpoint.jsonl"
+        gm.ORDERBOOK_CACHE_PATH = Path(tmp) / "orderbooks.json"
+        gm.CANDLE_CACHE_PATH = Path(tmp) / "candles.npz"
+        gm._session = None
+        gm._rate_limiter = gm.AdaptiveRateLimiter(
+            client_rate or gm.MAX_REQUESTS_PER_SECOND, gm.REQUEST_BURST,
+            max_rate=max(client_rate or 0, client_max_rate or gm.RATE_MAX),
+        )
+        mock.reset_stats()
+        log = io.StringIO()
+        start = time.perf_counter()
+        try:
+            with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+                markets, _, race_urls = gm.pull_all_markets(kalshi_ids, workers=workers, bulk=bulk)
+            pulled = len(markets)
+            events = len(set(markets["event_ticker"]))
+            urls = sum(1 for url in race_urls.values() if url)
+            if depth:
+                book_start = time.perf_counter()
+                with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+                    depths = gm.add_book_depth(markets, workers)["depth"]
+                two_sided = (markets["yes_bid"] > 0) & (markets["yes_ask"] > 0)
+                books = {
+                    "expected": int(two_sided.sum()),
+                    "pulled": int((~np.isnan(depths)).sum()),
+                    "seconds": round(time.perf_counter() - book_start, 3),
+                }
+            if candles:
+                history = {}
+                now = int(time.time())
+                for name, at in (("backfill", now), ("incremental", now + 60 * gm.CANDLE_PERIOD_MINUTES)):
+                    pass_start = time.perf_counter()
+                    before = mock.stats["endpoints"].get("candles", {}).get("requests", 0)
+                    with contextlib.redirect_stdout(log), contextlib.redirect_stderr(log):
+                        vwap = gm.add_price_history(markets, workers, now=at)["vwap"]
+                    history[name] = {
+                        "requests": mock.stats["endpoints"].get("candles", {}).get("requests", 0) - before,
+                        "seconds": round(time.perf_counter() - pass_start, 3),
+                        "priced": int((~np.isnan(vwap)).sum()),
+                    }
+                history["cache_mb"] = round(gm.CANDLE_CACHE_PATH.stat().st_size / 2**20, 2)
+        except SystemExit:
+            pulled = events = urls = 0
+        elapsed = time.perf_counter() - start
+        rate_control = gm._rate_limiter.summary()
+        (gm.BASE_URL, gm.SERIES_CACHE_PATH, gm.PULL_CHECKPOINT_PATH, gm.ORDERBOOK_CACHE_PATH,
+         gm.CANDLE_CACHE_PATH, gm._rate_limiter, gm._session) = saved
+
+    stats = mock.stats
+    warnings = [line for line in log.getvalue().splitlines() if "[WARN]" in line]
+    return {
+        "seconds": round(elapsed, 3),
+        "requests": stats["requests"],
+        "requests_per_s": round(stats["requests"] / elapsed, 1) if elapsed else None,
+        "retries": stats["retries"],
+        "status": stats["status"],
+        "truncated_pages": stats["truncated_pages"],
+        "endpoints": {
+            name: {"requests": ep["requests"], "span_s": round(ep["last_s"] - ep["first_s"], 3)}
+            for name, ep in stats["endpoints"].items()
+        },
+        "contracts": {"expected": expected, "pulled": pulled},
+        "contracts_per_s": round(pulled / elapsed, 1) if elapsed else None,
+        "events": {"expected": kalshi_ids["event_ticker"].nunique(), "pulled": events},
+        "race_urls": urls,
+        "order_books": books,
+        "price_history": history,
+        "rate_control": rate_control,
+        "warnings": warnings,
+    }
+
+
+def print_report(report):
+    c, e = report["contracts"], report["events"]
+    print(f"End-to-end fetch:  {report['seconds']:.2f}s")
+    print(f"Requests:          {report['requests']} ({report['requests_per_s']}/s), "
+          f"{report['retries']} retries")
+    print("Status codes:      " + ", ".join(f"{k}: {v}" for k, v in sorted(report["status"].items())))
+    for name, ep in sorted(report["endpoints"].items()):
+        print(f"  {name:8s} {ep['requests']:6d} requests over {ep['span_s']:.2f}s")
+    if report["truncated_pages"]:
+        print(f"Truncated pages:   {report['truncated_pages']}")
+    print(f"Contracts:         {c['pulled']}/{c['expected']} ({report['contracts_per_s']}/s)")
+    print(f"Events:            {e['pulled']}/{e['expected']}")
+    print(f"Race URLs:         {report['race_urls']}")
+    if report["order_books"]:
+        b = report["order_books"]
+        print(f"Order books:       {b['pulled']}/{b['expected']} in {b['seconds']:.2f}s")
+    if report["price_history"]:
+        h = report["price_history"]
+        for name in ("backfill", "incremental"):
+            print(f"Candles ({name + '):':13s}{h[name]['requests']} requests in {h[name]['seconds']:.2f}s, "
+                  f"{h[name]['priced']} contracts with a VWAP")
+        print(f"Candle cache:      {h['cache_mb']} MB")
+    rc = report["rate_control"]
+    print(f"Client rate:       {rc['initial_rps']:.1f} -> {rc['final_rps']:.1f} req/s "
+          f"(min {rc['min_rps']:.1f}, max {rc['max_rps']:.1f}), {rc['throttled']} throttled, "
+          f"{rc['decreases']} decreases, {rc['paused_s']:.1f}s paused")
+    if report["warnings"]:
+        print(f"Warnings:          {len(report['warnings'])}")
+        for line in report["warnings"][:10]:
+            print(f"  {line.strip()}")
+
+
+# ---------------------------------------------------------------------------
+# MAIN
+# ---------------------------------------------------------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Local Kalshi API stand-in with fault injection")
+    parser.add_argument("mode", choices=["serve", "bench"])
+    source = parser.add_mutually_exclusive_group()
+    source.add_argument("--contracts", type=int, default=1100, help="synthetic contract count (default 1100)")
+    source.add_argument("--fixture", type=Path, help="synth_markets.py output directory to replay")
+    source.add_argument("--snapshot", type=Path, help="recorded .npz snapshot to replay")
+    parser.add_argument("--seed", type=int, default=0)
+
+    faults = parser.add_argument_group("faults")
+    faults.add_argument("--latency", type=float, default=0.0, help="seconds added to every request")
+    faults.add_argument("--jitter", type=float, default=0.0, help="+/- uniform jitter on --latency")
+    faults.add_argument("--error-rate", type=float, default=0.0, help="share of requests answered 503")
+    faults.add_argument("--rate-limit", type=float, help="server-side requests/sec before 429s")
+    faults.add_argument("--storm-every", type=float, default=0.0, help="seconds between 429 storms")
+    faults.add_argument("--storm-for", type=float, default=0.0, help="length of each 429 storm (seconds)")
+    faults.add_argument("--truncate-rate", type=float, default=0.0,
+                        help="share of /markets pages with has_more but no cursor")
+    faults.add_argument("--series-latency", type=float, default=0.0,
+                        help="extra seconds on every /series lookup")
+    faults.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE, help="max markets per page")
+
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765, help="serve mode only (bench picks a free port)")
+    parser.add_argument("--workers", type=int, default=gm.MAX_CONCURRENT_REQUESTS, help="bench: fetch threads")
+    parser.add_argument("--no-bulk", action="store_true", help="bench: per-event fetches only")
+    parser.add_argument("--depth", action="store_true", help="bench: also fetch order books (two-sided contracts)")
+    parser.add_argument("--candles", action="store_true", help="bench: also backfill and update price history")
+    parser.add_argument("--client-rate", type=float,
+                        help="bench: starting client requests/sec (default MAX_REQUESTS_PER_SECOND)")
+    parser.add_argument("--client-max-rate", type=float,
+                        help="bench: client rate ceiling (default RATE_MAX)")
+    parser.add_argument("--json", type=Path, help="bench: write the report here")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.snapshot:
+        markets, kalshi_ids = snapshot_markets(args.snapshot)
+    elif args.fixture:
+        markets, kalshi_ids = load_fixture(args.fixture)
+    else:
+        markets, kalshi_ids = synth_markets.generate(args.contracts, seed=args.seed)
+
+    mock = MockKalshi(
+        markets, host=args.host, port=args.port if args.mode == "serve" else 0,
+        page_size=args.page_size, latency=args.latency, jitter=args.jitter,
+        error_rate=args.error_rate, rate_limit=args.rate_limit,
+        storm_every=args.storm_every, storm_for=args.storm_for,
+        truncate_rate=args.truncate_rate, series_latency=args.series_latency, seed=args.seed,
+    )
+    n = sum(len(records) for records in markets.values())
+    print(f"Serving {n} contracts in {len(markets)} events at {mock.url}", file=sys.stderr)
+
+    if args.mode == "serve":
+        try:
+            mock.httpd.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            mock.httpd.server_close()
+        return
+
+    with mock:
+        report = run_fetch(mock, kalshi_ids, args.workers, bulk=not args.no_bulk,
+                           client_rate=args.client_rate, client_max_rate=args.client_max_rate,
+                           depth=args.depth, candles=args.candles)
+    print_report(report)
+    if args.json:
+        args.json.parent.mkdir(parents=True, exist_ok=True)
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
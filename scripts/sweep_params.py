@@ -0,0 +1,304 @@
+"""
+sweep_params.py -- Historical backtest / parameter sweep for the grades pipeline
+
+Re-grades archived raw snapshots (src/data/snapshots/*.npz, written by
+grade_markets.py) under a grid of grading parameters and reports, per
+parameter set, how well its ratings agree with a reference and how much
+they churn from one snapshot to the next.
+
+Everything that does not depend on the parameters (percentile ranks, book
+state, race grouping) is computed once per snapshot. Parameter sets are
+then evaluated in chunks as (parameter set x contract) NumPy broadcasts,
+with chunks spread over a process pool.
+
+Grid values are comma lists or inclusive start:stop:step ranges. If
+weight_oi is not swept it is set to 1 - weight_volume - weight_spread.
+Snapshots pulled with --depth or --candles are graded the way the grader
+grades them: weight_depth blends in the order-book rank, and VWAP stands in
+for the last trade.
+
+Usage:
+    python scripts/sweep_params.py src/data/snapshots \\
+        --param weight_volume=0.2:0.5:0.05 --param shrinkage_alpha=1.0:1.5:0.05 \\
+        --reference src/data/grades/2026-03-11.json --out sweep.csv
+"""
+
+import sys
+import csv
+import json
+import argparse
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import grade_markets as gm
+
+# ---------------------------------------------------------------------------
+# PARAMETERS
+# ---------------------------------------------------------------------------
+PARAM_DEFAULTS = {
+    "weight_volume": gm.WEIGHT_VOLUME,
+    "weight_spread": gm.WEIGHT_SPREAD,
+    "weight_oi": gm.WEIGHT_OI,
+    "weight_depth": gm.WEIGHT_DEPTH,  # only used for snapshots with order-book depth
+    "last_trade_weight_min": gm.LAST_TRADE_WEIGHT_MIN,
+    "last_trade_weight_max": gm.LAST_TRADE_WEIGHT_MAX,
+    "shrinkage_alpha": gm.SHRINKAGE_ALPHA,
+    **{f"margin_mult_{k.lower()}": v for k, v in gm.MARGIN_MULT.items()},
+}
+PARAM_NAMES = list(PARAM_DEFAULTS)
+P = {name: i for i, name in enumerate(PARAM_NAMES)}
+
+# Rating labels -> ordinal scale (Solid D = -3 ... Solid R = +3)
+RATING_SCALE = {
+    "Solid D": -3, "Likely D": -2, "Lean D": -1, "Tossup": 0, "Toss Up": 0,
+    "Lean R": 1, "Likely R": 2, "Solid R": 3,
+}
+RATING_THRESHOLDS = np.array([t for t, _ in reversed(gm.RATING_BREAKS)], dtype=float)
+
+CHUNK_SIZE = 256  # parameter sets evaluated per broadcast
+
+
+def parse_values(text):
+    """'0.1,0.2' -> [0.1, 0.2]; '0.1:0.5:0.1' -> [0.1, 0.2, 0.3, 0.4, 0.5]."""
+    if ":" in text:
+        start, stop, step = (float(x) for x in text.split(":"))
+        n = int(round((stop - start) / step)) + 1
+        return [round(start + i * step, 10) for i in range(n)]
+    return [float(x) for x in text.split(",")]
+
+
+def build_grid(specs):
+    """Cartesian product of swept values (defaults elsewhere) as a (k, params) array."""
+    values = {name: [default] for name, default in PARAM_DEFAULTS.items()}
+    swept = set()
+    for spec in specs:
+        name, _, text = spec.partition("=")
+        if name not in PARAM_DEFAULTS:
+            raise SystemExit(f"Unknown parameter {name!r}; choose from {', '.join(PARAM_NAMES)}")
+        values[name] = parse_values(text)
+        swept.add(name)
+
+    grid = np.array(list(itertools.product(*(values[n] for n in PARAM_NAMES))), dtype=float)
+    weights = grid[:, [P["weight_volume"], P["weight_spread"], P["weight_oi"]]]
+    if "weight_oi" not in swept:
+        grid[:, P["weight_oi"]] = np.round(1.0 - weights[:, 0] - weights[:, 1], 10)
+        keep = grid[:, P["weight_oi"]] >= 0
+    else:
+        keep = np.abs(weights.sum(axis=1) - 1.0) < 1e-9
+    grid = grid[keep & (grid[:, P["last_trade_weight_min"]] <= grid[:, P["last_trade_weight_max"]])]
+    return np.unique(grid, axis=0)
+
+
+# ---------------------------------------------------------------------------
+# SNAPSHOT FEATURES (parameter independent)
+# ---------------------------------------------------------------------------
+def prepare_snapshot(path):
+    """Load a snapshot and precompute everything the parameters don't touch.
+
+    Percentile ranks, book state and raw prices come from the grader's own
+    kernels (build_contracts, score_contracts, race_win_pct).
+    """
+    markets, race_event, _, as_of = gm.load_snapshot(path)
+    contracts, race_ids = gm.build_contracts(markets, race_event)
+    probs = gm.compute_probability_arrays(contracts)
+    results = gm.race_win_pct(probs, contracts, len(race_ids))
+
+    keep = np.not_equal(contracts["party"], None)
+    df = {col: values[keep] for col, values in contracts.items()}
+    bid, ask, last = df["yes_bid"], df["yes_ask"], df["last_price"]
+    trade = last if "vwap" not in df else np.where(np.isnan(df["vwap"]), last, df["vwap"])
+    two_sided = probs["has_two_sided"]
+    stale = two_sided & ((trade < bid) | (trade > ask))
+    nearest = np.where(np.abs(trade - bid) < np.abs(trade - ask), bid, ask)
+    no_trades = (last == 0) & (df["volume"] == 0)
+
+    codes = df["race"]
+    valid = two_sided & ~no_trades & (codes >= 0)
+    depth_pct = None
+    if "depth" in df:
+        depth_pct = gm.depth_ranks(df["depth"], two_sided, df["race_type"], probs["spread_pct"])[valid]
+    days = max((gm.ELECTION_DAY - as_of).days, 0)
+    return {
+        "name": Path(path).name,
+        "race_ids": race_ids,
+        "race_type": np.array([rid[0] for rid in race_ids]),
+        "raw_r_pct": results["raw_r_pct"],
+        "sd_house": ((days ** 0.6) / 3200.0) + 0.036,
+        "codes": codes[valid],
+        "is_r": (df["party"] == "R")[valid],
+        "volume_pct": probs["volume_pct"][valid],
+        "spread_pct": probs["spread_pct"][valid],
+        "oi_pct": probs["oi_pct"][valid],
+        "depth_pct": depth_pct,
+        "stale": stale[valid],
+        "price": np.where(stale, nearest, trade)[valid],
+        "midpoint": ((bid + ask) / 2)[valid],
+    }
+
+
+# ---------------------------------------------------------------------------
+# BROADCAST GRADING
+# ---------------------------------------------------------------------------
+def rate_snapshot(snap, params):
+    """Ratings on the -3..+3 scale for every (parameter set, race); NaN = unrated.
+
+    Mirrors score_contracts -> race_win_pct -> implied_margins (plus the
+    auto-Solid fallback) with each parameter broadcast along the first axis.
+    """
+    def col(name):
+        return params[:, P[name], None]
+
+    n_races = len(snap["race_ids"])
+
+    composite = (
+        col("weight_volume") * snap["volume_pct"]
+        + col("weight_spread") * snap["spread_pct"]
+        + col("weight_oi") * snap["oi_pct"]
+    )
+    if snap["depth_pct"] is not None:
+        composite = (1 - col("weight_depth")) * composite + col("weight_depth") * snap["depth_pct"]
+    lt_min, lt_max = col("last_trade_weight_min"), col("last_trade_weight_max")
+    ltw = np.where(snap["stale"], lt_min, lt_min + ((lt_max - lt_min) * composite))
+    prob = (ltw * snap["price"]) + ((1.0 - ltw) * snap["midpoint"])
+
+    codes = snap["codes"]
+    total, n_valid = gm.group_sums(prob, codes, n_races)
+    rated = (n_valid > 0) & (total > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        normalized = (prob / total[:, codes]) * 100
+        non_r_total, _ = gm.group_sums(normalized, codes, n_races)
+        first_r = gm.group_first(snap["is_r"], codes, n_races)
+        rep_pct = np.where(first_r >= 0, normalized[:, first_r], 100 - non_r_total)
+        p = np.where(rated, rep_pct, np.nan) / 100
+
+        alpha = col("shrinkage_alpha")
+        shrunk = ((p ** alpha) / (p ** alpha + (1 - p) ** alpha)) * 100
+    shrunk[(shrunk <= 0) | (shrunk >= 100)] = np.nan
+    z = gm.inv_norm_cdf(np.clip(shrunk / 100.0, 1e-4, 1 - 1e-4))
+
+    mult = np.ones((len(params), n_races))
+    for race_type in gm.MARGIN_MULT:
+        mult[:, snap["race_type"] == race_type] = params[:, P[f"margin_mult_{race_type.lower()}"], None]
+    margin = np.round(z * (snap["sd_house"] * mult) * 200)
+
+    rating = np.searchsorted(RATING_THRESHOLDS, np.nan_to_num(margin), side="right") - 3.0
+    rating[np.isnan(margin)] = np.nan
+    raw_r = snap["raw_r_pct"]
+    auto = np.where(raw_r >= gm.AUTO_SOLID_THRESHOLD, 3.0,
+                    np.where(raw_r <= 100 - gm.AUTO_SOLID_THRESHOLD, -3.0, np.nan))
+    return np.where(rated, rating, auto)
+
+
+def evaluate_chunk(params):
+    """Agreement and churn for a chunk of parameter sets over every snapshot."""
+    k = len(params)
+    matches, deviation, compared = np.zeros(k), np.zeros(k), np.zeros(k)
+    changes, carried = np.zeros(k), np.zeros(k)
+    rated = np.zeros(k)
+    previous = None
+    for snap in _worker["snapshots"]:
+        ratings = np.full((k, len(_worker["universe"])), np.nan)
+        ratings[:, snap["universe_idx"]] = rate_snapshot(snap, params)
+        rated += (~np.isnan(ratings)).sum(axis=1)
+
+        reference = _worker["reference"]
+        both = ~np.isnan(ratings) & ~np.isnan(reference)
+        matches += (both & (ratings == reference)).sum(axis=1)
+        deviation += np.where(both, np.abs(ratings - reference), 0).sum(axis=1)
+        compared += both.sum(axis=1)
+
+        if previous is not None:
+            both = ~np.isnan(ratings) & ~np.isnan(previous)
+            changes += (both & (ratings != previous)).sum(axis=1)
+            carried += both.sum(axis=1)
+        previous = ratings
+
+    n_snaps = len(_worker["snapshots"])
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.column_stack([
+            rated / n_snaps,
+            matches / compared,
+            deviation / compared,
+            changes / carried,
+        ])
+
+
+_worker = {}
+
+
+def _init_worker(snapshots, universe, reference):
+    _worker.update(snapshots=snapshots, universe=universe, reference=reference)
+
+
+# ---------------------------------------------------------------------------
+# REFERENCE RATINGS
+# ---------------------------------------------------------------------------
+def load_reference(path):
+    """{race_id: rating label} from a grades JSON or a race_id,rating CSV."""
+    path = Path(path)
+    if path.suffix == ".json":
+        with open(path) as f:
+            return {r["race_id"]: r["rating"] for r in json.load(f)["races"] if r.get("rating")}
+    with open(path, newline="") as f:
+        return {row["race_id"]: row["rating"] for row in csv.DictReader(f) if row.get("rating")}
+
+
+# ---------------------------------------------------------------------------
+# MAIN
+# ---------------------------------------------------------------------------
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep grading parameters over archived snapshots")
+    parser.add_argument("snapshots", nargs="+", type=Path, help="snapshot files or directories")
+    parser.add_argument(
+        "--param", action="append", default=[], metavar="NAME=VALUES",
+        help=f"values to sweep for one of: {', '.join(PARAM_NAMES)}",
+    )
+    parser.add_argument(
+        "--reference", type=Path, default=gm.OUTPUT_DIR / "latest.json",
+        help="reference ratings: grades JSON or race_id,rating CSV (default latest.json)",
+    )
+    parser.add_argument("--processes", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--out", type=Path, help="write every parameter set's metrics to this CSV")
+    parser.add_argument("--top", type=int, default=10, help="rows to print (default 10)")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    paths = gm.snapshot_paths(args.snapshots)
+    if not paths:
+        sys.exit("No snapshots found.")
+    grid = build_grid(args.param)
+    print(f"Preparing {len(paths)} snapshots for {len(grid)} parameter sets...")
+
+    snapshots = [prepare_snapshot(p) for p in paths]
+    universe = sorted(set().union(*(s["race_ids"] for s in snapshots)))
+    index = {rid: i for i, rid in enumerate(universe)}
+    for snap in snapshots:
+        snap["universe_idx"] = np.array([index[rid] for rid in snap["race_ids"]], dtype=int)
+    ref_labels = load_reference(args.reference)
+    reference = np.array([RATING_SCALE.get(ref_labels.get(rid), np.nan) for rid in universe], dtype=float)
+
+    chunks = [grid[i:i + args.chunk_size] for i in range(0, len(grid), args.chunk_size)]
+    with ProcessPoolExecutor(args.processes, initializer=_init_worker,
+                             initargs=(snapshots, universe, reference)) as pool:
+        metrics = np.vstack(list(pool.map(evaluate_chunk, chunks)))
+
+    columns = PARAM_NAMES + ["rated", "agreement", "mean_abs_dev", "churn"]
+    table = pd.DataFrame(np.column_stack([grid, metrics]), columns=columns)
+    table = table.sort_values(["agreement", "mean_abs_dev", "churn"], ascending=[False, True, True])
+    if args.out:
+        table.to_csv(args.out, index=False, float_format="%.6g")
+        print(f"Wrote {len(table)} parameter sets to {args.out}")
+
+    print(f"\nTop {args.top} of {len(table)} parameter sets vs {args.reference.name}:")
+    print(table.head(args.top).to_string(index=False, float_format=lambda v: f"{v:.4g}"))
+
+
+if __name__ == "__main__":
+    main()
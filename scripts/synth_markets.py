@@ -0,0 +1,225 @@
+"""
+synth_markets.py -- Synthetic Kalshi /markets payloads for offline testing
+
+Generates a fake race universe (kalshi_ids-style race_id -> event_ticker
+table) and the /markets records for it, at any scale from a few hundred to
+100k+ contracts. Each race gets Republican/Democratic contracts (sometimes
+a lone party, extra candidates or an override candidate like the real
+Nebraska race), and each contract's book is drawn from a configurable mix:
+
+  two_sided  bid and ask both quoted, recent trades, real volume
+  one_sided  only a bid or only an ask
+  stale      quotes live, but the last trade printed outside them
+  thin       wide spread, a handful of contracts traded
+
+Prices are in cents and follow a per-race Republican win probability, so
+the pair of party contracts stays roughly coherent. Output is deterministic
+for a given seed.
+
+Usage:
+    python scripts/synth_markets.py --contracts 5000 --seed 1 --out /tmp/synth
+    # -> /tmp/synth/markets.json ({event_ticker: [market, ...]}) + kalshi_ids.csv
+    python scripts/mock_kalshi.py bench --fixture /tmp/synth   # replay over HTTP
+"""
+
+import sys
+import json
+import argparse
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+import grade_markets as gm
+
+# ---------------------------------------------------------------------------
+# CONFIG
+# ---------------------------------------------------------------------------
+BOOK_MIX = {"two_sided": 0.60, "one_sided": 0.15, "stale": 0.10, "thin": 0.15}
+
+# Share of races by chamber (the real universe is ~85% House)
+CHAMBER_MIX = {"H": 0.86, "S": 0.07, "G": 0.07}
+
+# Race shapes: both parties, one party only, parties + extra candidates,
+# override candidates (independent vs Republican, like NE Senate)
+RACE_SHAPES = {"two_party": 0.80, "one_party": 0.08, "multi": 0.10, "override": 0.02}
+
+STATES = sorted(gm.STATE_NAMES)
+OVERRIDE_NAMES = {"I": "Dan Osborn", "R": "Deb Fischer"}
+FILLER_TITLE = "Which party will win the race?"
+FILLER_RULES = "If the candidate of the listed party wins the election, the market resolves to Yes. " * 3
+
+
+# ---------------------------------------------------------------------------
+# RACES
+# ---------------------------------------------------------------------------
+def generate_races(n_races, rng):
+    """kalshi_ids-style table of synthetic races with unique race ids and tickers."""
+    chambers = rng.choice(list(CHAMBER_MIX), size=n_races, p=list(CHAMBER_MIX.values()))
+    states = rng.choice(STATES, size=n_races)
+    rows, seen = [], set()
+    for i, (ch, st) in enumerate(zip(chambers, states)):
+        # Sequence numbers keep ids unique however many races share a state
+        seq = i % 1000
+        race_id = f"{ch}2026{st}{seq:02d}"
+        while race_id in seen:
+            seq += 1000
+            race_id = f"{ch}2026{st}{seq:02d}"
+        seen.add(race_id)
+        if ch == "H":
+            event = f"KXHOUSERACE-{st}{seq:02d}-26"
+        elif ch == "S":
+            event = f"SENATE{st}{seq}-26"
+        else:
+            event = f"GOVPARTY{st}{seq}-26"
+        rows.append((race_id, event))
+    return pd.DataFrame(rows, columns=["race_id", "event_ticker"])
+
+
+# ---------------------------------------------------------------------------
+# CONTRACTS
+# ---------------------------------------------------------------------------
+def _contract_titles(shape, rng):
+    if shape == "one_party":
+        return [rng.choice(["Republican Party", "Democratic Party"])]
+    if shape == "override":
+        return list(OVERRIDE_NAMES.values())
+    titles = ["Republican Party", "Democratic Party"]
+    if shape == "multi":
+        titles += [f"Candidate {k}" for k in range(1, rng.integers(2, 4))]
+    return titles
+
+
+def generate_books(r_prob, is_r, mix, rng):
+    """Vectorized price/size columns for contracts with the given race-level
+    Republican probability (0-1) and party flag, drawn from the book mix."""
+    n = len(r_prob)
+    kinds = rng.choice(list(mix), size=n, p=np.array(list(mix.values())) / sum(mix.values()))
+    fair = np.where(is_r, r_prob, 1 - r_prob)
+    fair_cents = np.clip(np.rint(fair * 100 + rng.normal(0, 2, n)), 1, 99)
+
+    half_spread = rng.choice([1, 1, 1, 2, 2, 3, 5], size=n)
+    half_spread = np.where(kinds == "thin", rng.integers(5, 25, n), half_spread)
+    bid = np.clip(fair_cents - half_spread, 0, 99)
+    ask = np.clip(fair_cents + half_spread, 1, 100)
+    ask = np.where(ask >= 100, 0, ask)  # no offer above 99
+    last = np.clip(fair_cents + rng.integers(-3, 4, n), 1, 99)
+    volume = np.rint(rng.lognormal(9, 2, n)).astype(np.int64)
+    open_interest = np.rint(volume * rng.uniform(0.05, 0.6, n)).astype(np.int64)
+
+    one_sided = kinds == "one_sided"
+    drop_bid = one_sided & (rng.random(n) < 0.5)
+    bid = np.where(drop_bid, 0, bid)
+    ask = np.where(one_sided & ~drop_bid, 0, ask)
+
+    # Stale: the book is quoted but the market moved away from the last
+    # print, which sits outside the bid/ask (on whichever side has room)
+    stale = kinds == "stale"
+    bid = np.where(stale, np.clip(fair_cents - half_spread, 1, 97), bid)
+    ask = np.where(stale, np.clip(fair_cents + half_spread, bid + 1, 99), ask)
+    gap = rng.integers(1, 11, n)
+    above = (rng.random(n) < 0.5) & (ask < 99) | (bid <= 1)
+    stale_last = np.where(above, np.minimum(ask + gap, 99), np.maximum(bid - gap, 1))
+    last = np.where(stale, stale_last, last)
+    volume = np.where(stale, rng.integers(1, 50, n), volume)
+
+    thin = kinds == "thin"
+    volume = np.where(thin, rng.integers(0, 200, n), volume)
+    open_interest = np.where(thin | stale, rng.integers(0, 100, n), open_interest)
+    last = np.where(thin & (volume == 0), 0, last)
+
+    return {
+        "yes_bid": bid.astype(int), "yes_ask": ask.astype(int), "last_price": last.astype(int),
+        "volume": volume, "open_interest": open_interest,
+    }
+
+
+def generate(n_contracts, seed=0, mix=None):
+    """(markets, kalshi_ids): {event_ticker: [market dict, ...]} with about
+    n_contracts contracts in total, plus the matching race table."""
+    rng = np.random.default_rng(seed)
+    mix = mix or BOOK_MIX
+    shapes = list(RACE_SHAPES)
+    shape_p = list(RACE_SHAPES.values())
+
+    # Races average ~2.1 contracts; draw spare races and stop at the target
+    kalshi_ids = generate_races(max(1, int(n_contracts / 1.8)), rng)
+    titles, events, race_prob = [], [], []
+    for event, shape, p in zip(
+        kalshi_ids["event_ticker"],
+        rng.choice(shapes, size=len(kalshi_ids), p=shape_p),
+        rng.beta(0.6, 0.6, size=len(kalshi_ids)),
+    ):
+        for title in _contract_titles(shape, rng):
+            titles.append(title)
+            events.append(event)
+            race_prob.append(p)
+        if len(titles) >= n_contracts:
+            break
+    used = set(events)
+    kalshi_ids = kalshi_ids[kalshi_ids["event_ticker"].isin(used)].reset_index(drop=True)
+
+    titles = np.array(titles, dtype=object)
+    is_r = np.array([t.startswith("Republican") or t == OVERRIDE_NAMES["R"] for t in titles])
+    cols = generate_books(np.array(race_prob), is_r, mix, rng)
+
+    markets = {e: [] for e in kalshi_ids["event_ticker"]}
+    for i, (event, title) in enumerate(zip(events, titles)):
+        rec = markets[event]
+        rec.append({
+            "ticker": f"{event}-{chr(65 + len(rec))}",
+            "event_ticker": event,
+            "yes_sub_title": title,
+            "title": FILLER_TITLE,
+            "status": "active",
+            "yes_bid": int(cols["yes_bid"][i]),
+            "yes_ask": int(cols["yes_ask"][i]),
+            "no_bid": 100 - int(cols["yes_ask"][i]) if cols["yes_ask"][i] else 0,
+            "no_ask": 100 - int(cols["yes_bid"][i]) if cols["yes_bid"][i] else 0,
+            "last_price": int(cols["last_price"][i]),
+            "volume": int(cols["volume"][i]),
+            "open_interest": int(cols["open_interest"][i]),
+            "rules_primary": FILLER_RULES,
+        })
+    return markets, kalshi_ids
+
+
+def write_fixture(markets, kalshi_ids, out_dir):
+    """Write markets.json + kalshi_ids.csv so a fixture can be replayed later."""
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    with open(out_dir / "markets.json", "w") as f:
+        json.dump(markets, f, separators=(",", ":"))
+    kalshi_ids.to_csv(out_dir / "kalshi_ids.csv", index=False)
+
+
+# ---------------------------------------------------------------------------
+# MAIN
+# ---------------------------------------------------------------------------
+def parse_mix(spec):
+    """"two_sided=0.5,thin=0.5" -> book mix dict (unlisted kinds get 0)."""
+    mix = dict.fromkeys(BOOK_MIX, 0.0)
+    for part in spec.split(","):
+        name, _, weight = part.partition("=")
+        if name not in mix:
+            raise argparse.ArgumentTypeError(f"unknown book kind {name!r} (one of {', '.join(BOOK_MIX)})")
+        mix[name] = float(weight)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate synthetic Kalshi markets")
+    parser.add_argument("--contracts", type=int, default=1100, help="approximate contract count (default 1100)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mix", type=parse_mix, help="book mix, e.g. two_sided=0.5,thin=0.5")
+    parser.add_argument("--out", type=Path, required=True, help="directory for markets.json + kalshi_ids.csv")
+    args = parser.parse_args(argv)
+
+    markets, kalshi_ids = generate(args.contracts, seed=args.seed, mix=args.mix)
+    write_fixture(markets, kalshi_ids, args.out)
+    n = sum(len(ms) for ms in markets.values())
+    print(f"Wrote {n} contracts in {len(kalshi_ids)} races to {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
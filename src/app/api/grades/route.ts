@@ -1,6 +1,7 @@
 import { NextRequest, NextResponse } from "next/server";
 import fs from "fs";
 import path from "path";
+import { Readable } from "stream";
 
 // ---------------------------------------------------------------------------
 // In-memory rate limiter — 30 requests per IP per minute
@@ -27,6 +28,11 @@ function isRateLimited(ip: string): boolean {
 }
 
 const gradesDir = path.join(process.cwd(), "src/data/grades");
+// Prebuilt response bodies written by scripts/grades_api.py (npm's prebuild
+// step): <date|latest>/<all|chamber-x|state-XX>.<json|txt|csv> plus
+// dates.<json|txt>, each with a .gz twin. Lookups they do not cover (older
+// dates, filters) fall back to the grades files.
+const apiDir = path.join(gradesDir, "api");
 
 interface Race {
   race_id: string;
@@ -72,6 +78,82 @@ function listAvailableDates(): string[] {
     .reverse();
 }
 
+// ---------------------------------------------------------------------------
+// Prebuilt artifacts
+// ---------------------------------------------------------------------------
+type Format = "json" | "txt" | "csv";
+
+const CONTENT_TYPES: Record<Format, string> = {
+  json: "application/json",
+  txt: "text/plain; charset=utf-8",
+  csv: "text/csv; charset=utf-8",
+};
+
+// Stream a prebuilt artifact (gzip twin when the client accepts it), or
+// return null so the caller falls back to building the response itself.
+function servePrebuilt(name: string, format: Format, request: NextRequest): Response | null {
+  const file = path.join(apiDir, `${name}.${format}`);
+  const acceptsGzip = /\bgzip\b/.test(request.headers.get("accept-encoding") ?? "");
+  const target = acceptsGzip && fs.existsSync(`${file}.gz`) ? `${file}.gz` : file;
+
+  let size: number;
+  try {
+    size = fs.statSync(target).size;
+  } catch {
+    return null;
+  }
+  const headers: Record<string, string> = {
+    "Content-Type": CONTENT_TYPES[format],
+    "Content-Length": String(size),
+    Vary: "Accept-Encoding",
+  };
+  if (target !== file) headers["Content-Encoding"] = "gzip";
+  const body = Readable.toWeb(fs.createReadStream(target)) as unknown as ReadableStream;
+  return new Response(body, { headers });
+}
+
+// Artifact name for a date + chamber/state filter, or null if the request
+// needs in-memory filtering (or its parameters can't name a file).
+function prebuiltName(
+  dateParam: string | null, chamber: string | null, state: string | null
+): string | null {
+  let dir: string;
+  if (!dateParam || dateParam === "latest") dir = "latest";
+  else if (/^\d{4}-\d{2}-\d{2}$/.test(dateParam)) dir = dateParam;
+  else return null;
+
+  if (chamber && state) return null;
+  if (state) {
+    const s = state.toUpperCase();
+    return /^[A-Z]{2}$/.test(s) ? `${dir}/state-${s}` : null;
+  }
+  if (chamber) {
+    const c = chamber.toLowerCase();
+    return /^[a-z]+$/.test(c) ? `${dir}/chamber-${c}` : null;
+  }
+  return `${dir}/all`;
+}
+
+// ---------------------------------------------------------------------------
+// CSV formatter
+// ---------------------------------------------------------------------------
+const CSV_FIELDS: (keyof Race)[] = [
+  "race_id", "event_ticker", "kalshi_url", "chamber", "state", "state_name", "label",
+  "grade", "liquidity_score", "volume_pct", "spread_pct", "oi_pct", "rating", "margin",
+];
+
+function csvCell(value: unknown): string {
+  if (value === null || value === undefined) return "";
+  const s = String(value);
+  return /[",\r\n]/.test(s) ? `"${s.replace(/"/g, '""')}"` : s;
+}
+
+function formatCsv(races: Race[]): string {
+  const lines = [CSV_FIELDS.join(",")];
+  for (const r of races) lines.push(CSV_FIELDS.map((f) => csvCell(r[f])).join(","));
+  return lines.join("\n") + "\n";
+}
+
 // ---------------------------------------------------------------------------
 // ASCII table formatter
 // ---------------------------------------------------------------------------
@@ -217,9 +299,13 @@ export async function GET(request: NextRequest) {
   const { searchParams } = request.nextUrl;
   const format = searchParams.get("format");
   const isTable = format === "table" || format === "pretty";
+  const isCsv = format === "csv";
+  const fileFormat: Format = isTable ? "txt" : isCsv ? "csv" : "json";
 
   // Meta endpoint: list available dates
   if (searchParams.get("dates") !== null) {
+    const prebuilt = servePrebuilt("dates", isTable ? "txt" : "json", request);
+    if (prebuilt) return prebuilt;
     if (isTable) {
       const dates = listAvailableDates();
       const text = "\n  Available dates:\n\n" + dates.map((d) => `    ${d}`).join("\n") + "\n";
@@ -231,6 +317,19 @@ export async function GET(request: NextRequest) {
   }
 
   const dateParam = searchParams.get("date");
+  const chamber = searchParams.get("chamber");
+  const state = searchParams.get("state");
+  const grade = searchParams.get("grade");
+  const minLiq = searchParams.get("min_liquidity");
+  const raceId = searchParams.get("race");
+
+  // Plain date/chamber/state queries are served straight from disk
+  if (!grade && !minLiq && !raceId) {
+    const name = prebuiltName(dateParam, chamber, state);
+    const prebuilt = name ? servePrebuilt(name, fileFormat, request) : null;
+    if (prebuilt) return prebuilt;
+  }
+
   const data = loadGrades(dateParam);
 
   if (!data) {
@@ -249,25 +348,21 @@ export async function GET(request: NextRequest) {
   // Apply filters
   let races = data.races;
 
-  const chamber = searchParams.get("chamber");
   if (chamber) {
     const c = chamber.toLowerCase();
     races = races.filter((r) => r.chamber.toLowerCase() === c);
   }
 
-  const state = searchParams.get("state");
   if (state) {
     const s = state.toUpperCase();
     races = races.filter((r) => r.state === s);
   }
 
-  const grade = searchParams.get("grade");
   if (grade) {
     const g = grade.toUpperCase();
     races = races.filter((r) => r.grade === g);
   }
 
-  const minLiq = searchParams.get("min_liquidity");
   if (minLiq) {
     const threshold = parseFloat(minLiq);
     if (!isNaN(threshold)) {
@@ -276,7 +371,6 @@ export async function GET(request: NextRequest) {
   }
 
   // Single race lookup
-  const raceId = searchParams.get("race");
   if (raceId) {
     const rid = raceId.toUpperCase();
     const race = races.find((r) => r.race_id === rid);
@@ -303,6 +397,11 @@ export async function GET(request: NextRequest) {
       headers: { "Content-Type": "text/plain; charset=utf-8" },
     });
   }
+  if (isCsv) {
+    return new NextResponse(formatCsv(races), {
+      headers: { "Content-Type": CONTENT_TYPES.csv },
+    });
+  }
 
   return NextResponse.json({ date: data.date, total: races.length, races });
 }
@@ -0,0 +1,96 @@
+"""Shared fixtures for the grades pipeline tests (scripts/*.py).
+
+Run from the repo root with `python -m pytest tests`. Every test gets its
+own output, cache and data directories, and the fetch tests run against
+an in-process mock_kalshi server on a fixed synth_markets seed.
+"""
+
+import sys
+import copy
+import datetime
+from pathlib import Path
+
+import pytest
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+import grade_markets as gm  # noqa: E402
+import mock_kalshi  # noqa: E402
+import synth_markets  # noqa: E402
+
+SYNTH_CONTRACTS = 300
+SYNTH_SEED = 7
+AS_OF = datetime.date(2026, 3, 11)
+
+
+@pytest.fixture
+def gm_env(tmp_path, monkeypatch):
+    """grade_markets with every output and cache path under tmp_path and a
+    fresh session, limiter and metrics."""
+    for name, sub in [
+        ("OUTPUT_DIR", "grades"), ("SNAPSHOT_DIR", "snapshots"), ("HISTORY_DIR", "history"),
+        ("CHANGES_DIR", "changes"), ("SIMULATIONS_DIR", "simulations"), ("CACHE_DIR", ".cache"),
+    ]:
+        monkeypatch.setattr(gm, name, tmp_path / sub)
+    for name in ["SERIES_CACHE_PATH", "PULL_CHECKPOINT_PATH", "ORDERBOOK_CACHE_PATH", "CANDLE_CACHE_PATH"]:
+        monkeypatch.setattr(gm, name, tmp_path / ".cache" / getattr(gm, name).name)
+    monkeypatch.setattr(gm, "_session", None)
+    monkeypatch.setattr(gm, "_rate_limiter", gm.AdaptiveRateLimiter(2000, 50, max_rate=2000))
+    monkeypatch.setattr(gm, "_metrics", gm.RunMetrics())
+    monkeypatch.setattr(gm, "FAILED_RETRY_BACKOFF", 0.0)
+    monkeypatch.setattr(gm, "SERVER_ERROR_BACKOFF", 0.0)
+    return tmp_path
+
+
+@pytest.fixture(scope="session")
+def synth():
+    """(markets, kalshi_ids) for the fixed synthetic race universe."""
+    return synth_markets.generate(SYNTH_CONTRACTS, seed=SYNTH_SEED)
+
+
+@pytest.fixture
+def mock(synth, gm_env, monkeypatch):
+    """A running MockKalshi over the synthetic markets, with grade_markets
+    pointed at it. Small pages so the bulk pull has to follow cursors."""
+    markets, _ = synth
+    server = mock_kalshi.MockKalshi(markets, page_size=100).start()
+    monkeypatch.setattr(gm, "BASE_URL", server.url)
+    yield server
+    server.stop()
+
+
+@pytest.fixture(scope="session")
+def synth_columns(synth):
+    """The synthetic markets as a MarketColumns, ingested without HTTP."""
+    markets, kalshi_ids = synth
+    columns = gm.MarketColumns()
+    for event_ticker, page in markets.items():
+        columns.extend(page, event_ticker=event_ticker)
+    return columns.ordered(list(kalshi_ids["event_ticker"]))
+
+
+@pytest.fixture
+def live(synth, gm_env, monkeypatch):
+    """(server, run): run(*argv) is one run_live against a private mock
+    whose markets a test can move, with kalshi_ids.csv matching it."""
+    markets, kalshi_ids = synth
+    ids_path = gm_env / "kalshi_ids.csv"
+    kalshi_ids.to_csv(ids_path, index=False)
+    monkeypatch.setattr(gm, "KALSHI_IDS_PATH", ids_path)
+    server = mock_kalshi.MockKalshi(copy.deepcopy(markets), page_size=100).start()
+    monkeypatch.setattr(gm, "BASE_URL", server.url)
+    yield server, lambda *argv: gm.run_live(gm.parse_args(["--draws", "0", "--workers", "4", *argv]))
+    server.stop()
+
+
+def move_race(server, latest):
+    """Price one close race with Republican and Democratic contracts as a
+    near-certain R win; returns its record from `latest`."""
+    moved = next(
+        r for r in latest["races"] if r["margin"] is not None and abs(r["margin"]) < 20
+        and any(m["yes_sub_title"] == "Republican Party" for m in server.markets[r["event_ticker"]])
+    )
+    for m in server.markets[moved["event_ticker"]]:
+        price = 95 if m["yes_sub_title"].startswith("Republican") else 4
+        m["yes_bid"], m["yes_ask"], m["last_price"] = price - 1, price + 1, price
+    return moved
@@ -0,0 +1,112 @@
+"""Prebuilt /api/grades artifacts: the files written per date, and parity
+of their bodies with what route.ts renders when it parses the grades."""
+
+import gzip
+import json
+import re
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+import grades_api
+
+ROOT = Path(__file__).resolve().parent.parent
+ROUTE = ROOT / "src" / "app" / "api" / "grades" / "route.ts"
+FIXTURE = ROOT / "src" / "data" / "grades" / "2026-03-11.json"
+
+# Type annotations route.ts uses in its formatters
+TS_TYPE = r"(?:\(keyof Race\)\[\]|Race\[\]|string\[\]|string|number|unknown|Race)"
+
+
+def route_formatters():
+    """CSV_FIELDS through formatTable from route.ts, with the types stripped
+    so node can run them as plain JavaScript."""
+    src = ROUTE.read_text()
+    src = src[src.index("const CSV_FIELDS"):src.index("function formatSingleRace")]
+    return re.sub(r"(\w|\))\??:\s*" + TS_TYPE + r"(?=\s*[,)=\{\n])", r"\1", src)
+
+
+def render_with_route(date, slices):
+    """{slice: {json, txt, csv}} as route.ts renders each slice's races."""
+    driver = route_formatters() + """
+const input = JSON.parse(require("fs").readFileSync(0, "utf8"));
+const out = {};
+for (const [name, races] of Object.entries(input.slices)) {
+  out[name] = {
+    json: JSON.stringify({ date: input.date, total: races.length, races }),
+    txt: formatTable(races, input.date),
+    csv: formatCsv(races),
+  };
+}
+process.stdout.write(JSON.stringify(out));
+"""
+    result = subprocess.run(
+        ["node", "-e", driver], input=json.dumps({"date": date, "slices": slices}),
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(result.stdout)
+
+
+def edge_races():
+    """Records that stress the JS number formatting: toFixed/Math.round
+    ties, integral floats, nulls, missing fields, long and quoted labels."""
+    base = {
+        "race_id": "H2026CA12", "event_ticker": "KXHOUSE-CA12", "kalshi_url": None,
+        "chamber": "House", "state": "CA", "state_name": "California", "label": "12",
+        "grade": "B", "liquidity_score": 0.25, "volume_pct": 0.125, "spread_pct": 0.005,
+        "oi_pct": 1.0, "rating": "Lean R", "margin": 4,
+    }
+    return [
+        base,
+        {**base, "race_id": "H2026CA13", "label": "13", "liquidity_score": 0.35, "volume_pct": 0.145,
+         "spread_pct": 0.015, "oi_pct": 0.0, "margin": None, "rating": None},
+        {**base, "race_id": "S2026GA01", "chamber": "Senate", "state": "GA", "label": "Georgia (special) long",
+         "liquidity_score": 1.0, "volume_pct": None, "spread_pct": 0.555, "oi_pct": 0.285},
+        {k: v for k, v in base.items() if k not in ("volume_pct", "spread_pct", "oi_pct", "kalshi_url")}
+        | {"race_id": "G2026NY01", "chamber": "Governor", "state": "NY", "label": 'New "York", NY'},
+        {**base, "race_id": "S2026ME01", "chamber": "Senate", "state": "ME", "label": "Maine — Collins",
+         "kalshi_url": "https://kalshi.com/markets/senateme", "liquidity_score": 0.05, "margin": -18},
+    ]
+
+
+@pytest.mark.skipif(shutil.which("node") is None, reason="needs node to run route.ts")
+@pytest.mark.parametrize("payload", [
+    json.loads(FIXTURE.read_text()),
+    {"date": "2026-03-12", "total_races": 5, "races": edge_races()},
+    {"date": "2026-03-13", "total_races": 0, "races": []},
+], ids=["grades-file", "edge-values", "empty"])
+def test_artifacts_match_route_rendering(payload):
+    slices = dict(grades_api.api_slices(payload["races"]))
+    expected = render_with_route(payload["date"], slices)
+    for name, races in slices.items():
+        body = {"date": payload["date"], "total": len(races), "races": races}
+        assert grades_api.render_json(body) == expected[name]["json"], name
+        assert grades_api.render_table(races, payload["date"]) == expected[name]["txt"], name
+        assert grades_api.render_csv(races) == expected[name]["csv"], name
+
+
+def test_write_api_artifacts_layout(tmp_path):
+    grades_dir = tmp_path / "grades"
+    grades_dir.mkdir()
+    payload = json.loads(FIXTURE.read_text())
+    days = [f"2026-03-{d:02d}" for d in range(1, 10)]
+    for day in days:
+        (grades_dir / f"{day}.json").write_text(json.dumps({**payload, "date": day}))
+    shutil.copy(FIXTURE, grades_dir / "latest.json")
+    grades_api.main(["--grades-dir", str(grades_dir)])
+
+    api = grades_dir / "api"
+    kept = sorted(p.name for p in api.iterdir() if p.is_dir())
+    assert kept == days[-grades_api.API_ARTIFACT_DAYS:] + ["latest"]
+    assert json.loads((api / "dates.json").read_text()) == {"available_dates": days[::-1]}
+    assert json.loads((api / days[-1] / "all.json").read_text())["date"] == days[-1]
+
+    chambers = {r["chamber"].lower() for r in payload["races"]}
+    states = {r["state"] for r in payload["races"]}
+    names = {p.name.split(".")[0] for p in (api / "latest").iterdir()}
+    assert names == {"all"} | {f"chamber-{c}" for c in chambers} | {f"state-{s}" for s in states}
+    for path in (api / "latest").glob("*.csv"):
+        assert gzip.decompress(path.with_name(path.name + ".gz").read_bytes()) == path.read_bytes()
+    assert json.loads((api / "latest" / "all.json").read_text())["total"] == payload["total_races"]
@@ -0,0 +1,113 @@
+"""Price history: the candle cache's incremental windows, the VWAP and
+volatility features, and --candles pulls against the mock's candlesticks."""
+
+import numpy as np
+import pytest
+
+import grade_markets as gm
+
+HOUR = 3600
+NOW = 1_780_000_000 + 1234  # mid-period
+
+
+def rows(*candles):
+    return np.array(list(candles), dtype=gm.CANDLE_DTYPE)
+
+
+def test_pending_backfills_then_extends(gm_env):
+    cache = gm.CandleCache(gm_env / "candles.npz")
+    end = cache.last_period(NOW)
+    assert end % HOUR == 0 and NOW - HOUR < end <= NOW
+    assert cache.pending(["A"], NOW) == {"A": (end - gm.CANDLE_BACKFILL_DAYS * 86400, end)}
+
+    cache.extend("A", rows((end, 50, 50, 3)), end - gm.CANDLE_BACKFILL_DAYS * 86400, end)
+    assert cache.pending(["A"], NOW + 60) == {}  # same period: nothing new
+    assert cache.pending(["A", "B"], NOW + HOUR) == {
+        "A": (end + 1, end + HOUR),
+        "B": (end + HOUR - gm.CANDLE_BACKFILL_DAYS * 86400, end + HOUR),
+    }
+
+
+def test_extend_replaces_the_refetched_window(gm_env):
+    cache = gm.CandleCache(gm_env / "candles.npz")
+    cache.extend("A", rows((HOUR, 40, 40, 1), (2 * HOUR, 41, 41, 1)), 0, 2 * HOUR)
+    cache.extend("A", rows((2 * HOUR, 45, 45, 9), (3 * HOUR, 46, 46, 1)), 2 * HOUR, 3 * HOUR)
+    assert cache.candles["A"]["end_ts"].tolist() == [HOUR, 2 * HOUR, 3 * HOUR]
+    assert cache.candles["A"]["volume"].tolist() == [1, 9, 1]
+    assert cache.through["A"] == 3 * HOUR
+
+
+def test_save_round_trip_drops_candles_outside_the_window(gm_env):
+    path = gm_env / "candles.npz"
+    cache = gm.CandleCache(path)
+    end = cache.last_period(NOW)
+    old = end - gm.CANDLE_BACKFILL_DAYS * 86400 - HOUR
+    cache.extend("A", rows((old, 30, 30, 5), (end, 31, 31, 5)), old, end)
+    cache.extend("B", rows(), end - HOUR, end)  # fetched, but no candles
+    cache.save(NOW)
+
+    loaded = gm.CandleCache(path)
+    assert loaded.through == {"A": end, "B": end}
+    assert loaded.candles["A"]["end_ts"].tolist() == [end]
+    assert len(loaded.candles["B"]) == 0
+    assert gm.CandleCache(gm_env / "missing.npz").through == {}
+
+
+def test_features(gm_env):
+    cache = gm.CandleCache(gm_env / "candles.npz")
+    end = 100 * HOUR
+    cache.extend("A", rows(
+        (end - 30 * HOUR, 90, 90, 1000),  # outside the 24-hour window
+        (end - 3 * HOUR, 40, 42, 10),
+        (end - 2 * HOUR, np.nan, np.nan, 0),
+        (end - HOUR, 44, 45, 30),
+        (end, 43, 44, 0),
+    ), 0, end)
+    vwap, volatility = cache.features("A", end)
+    assert vwap == pytest.approx((42 * 10 + 45 * 30) / 40)
+    assert volatility == pytest.approx(np.std([4.0, -1.0]))
+
+    cache.extend("B", rows((end, np.nan, np.nan, 0)), 0, end)
+    assert all(np.isnan(cache.features("B", end)))
+    assert all(np.isnan(cache.features("C", end)))
+
+
+def test_fetch_candles_splits_long_windows(mock, synth_columns, monkeypatch):
+    monkeypatch.setattr(gm, "CANDLE_MAX_PERIODS", 100)
+    i = int(np.flatnonzero(synth_columns["volume"] > 0)[0])
+    ticker, event = synth_columns["ticker"][i], synth_columns["event_ticker"][i]
+    end = NOW - NOW % HOUR
+    candles = gm.fetch_candles(ticker, event, end - 250 * HOUR, end)
+    assert mock.stats["endpoints"]["candles"]["requests"] == 3
+    assert candles["end_ts"].tolist() == list(range(end - 250 * HOUR, end + 1, HOUR))
+
+
+def candle_requests(server):
+    return server.stats["endpoints"].get("candles", {}).get("requests", 0)
+
+
+def test_add_price_history_backfills_then_updates(mock, synth_columns, gm_env):
+    # A month of hourly candles per traded contract: keep the sample small,
+    # with a few contracts that never traded
+    records = synth_columns.records()[:60]
+    for rec in records[::6]:
+        rec["volume"] = 0
+    sample = gm.MarketColumns()
+    sample.extend(records)
+    traded = sample["volume"] > 0
+    markets = gm.add_price_history(sample, workers=4, now=NOW)
+    assert candle_requests(mock) == traded.sum()
+    assert np.isnan(markets["vwap"][~traded]).all() and np.isnan(markets["volatility"][~traded]).all()
+    assert not np.isnan(markets["vwap"][traded]).all()
+
+    mock.reset_stats()
+    gm.add_price_history(sample, workers=4, now=NOW + 60)
+    assert candle_requests(mock) == 0  # still inside the same period
+
+    later = NOW + HOUR
+    updated = gm.add_price_history(sample, workers=4, now=later)
+    assert candle_requests(mock) == traded.sum()  # one short request per contract
+
+    fresh = gm.add_price_history(sample, workers=4, now=later, path=gm_env / "fresh.npz")
+    np.testing.assert_array_equal(updated["vwap"], fresh["vwap"])
+    np.testing.assert_array_equal(updated["volatility"], fresh["volatility"])
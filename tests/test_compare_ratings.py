@@ -0,0 +1,123 @@
+"""compare_ratings: the (date x race) code matrix, the bincount confusion
+matrices and the agreement metrics derived from them."""
+
+import csv
+import json
+import datetime
+
+import numpy as np
+import pytest
+
+import compare_ratings as cr
+import grade_markets as gm
+
+
+def race(race_id, rating, margin=0):
+    chamber, state, state_name, label = gm.parse_race_id(race_id)
+    return {
+        "race_id": race_id, "event_ticker": f"EV-{race_id}", "kalshi_url": None,
+        "chamber": chamber, "state": state, "state_name": state_name, "label": label,
+        "grade": "B", "liquidity_score": 0.5, "rating": rating, "margin": margin,
+    }
+
+
+DAYS = {
+    "2026-03-10": [race("H2026AL01", "Lean R", 4), race("S2026GA01", "Tossup"), race("G2026AZ01", None, None)],
+    "2026-03-11": [race("H2026AL01", "Solid R", 30), race("S2026GA01", "Lean D", -3), race("G2026AZ01", "Likely D", -9),
+                   race("H2026CA22", "Tossup")],
+}
+SOURCE = {"H2026AL01": "Lean R", "S2026GA01": "Toss Up", "G2026AZ01": "Lean D", "H2026NY03": "Solid D"}
+
+
+@pytest.fixture
+def grades_dir(tmp_path):
+    d = tmp_path / "grades"
+    d.mkdir()
+    for date, races in DAYS.items():
+        payload = gm.grades_output(races, datetime.date.fromisoformat(date))
+        (d / f"{date}.json").write_text(gm.serialize_grades(payload))
+    (d / "latest.json").write_text("{}")
+    (d / "2026-03-11.metrics.json").write_text("{}")
+    return d
+
+
+@pytest.fixture
+def source(tmp_path):
+    path = tmp_path / "pundit.csv"
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["race_id", "rating"])
+        writer.writerows(SOURCE.items())
+        writer.writerow(["H2026TX07", ""])  # blank ratings are skipped
+    return path
+
+
+def test_grades_history_matrix(grades_dir):
+    dates, race_ids, codes, records = cr.load_grades_history(grades_dir)
+    assert dates == ["2026-03-10", "2026-03-11"]
+    assert list(race_ids) == ["G2026AZ01", "H2026AL01", "H2026CA22", "S2026GA01"]
+    code = cr.CATEGORY_CODES
+    np.testing.assert_array_equal(codes, [
+        [cr.UNRATED, code["Lean R"], cr.ABSENT, code["Tossup"]],
+        [code["Likely D"], code["Solid R"], code["Tossup"], code["Lean D"]],
+    ])
+    assert records["2026-03-11"]["H2026CA22"]["label"] == "CA-22"
+
+
+def test_load_source_rejects_unknown_labels(tmp_path, source):
+    assert cr.load_source(source) == {rid: cr.CATEGORY_CODES[label] for rid, label in SOURCE.items()}
+    bad = tmp_path / "bad.csv"
+    bad.write_text("race_id,rating\nH2026AL01,Leans Republican\n")
+    with pytest.raises(SystemExit, match="unknown rating"):
+        cr.load_source(bad)
+
+
+def test_metrics_match_a_hand_count(grades_dir, source):
+    dates, race_ids, codes, records = cr.load_grades_history(grades_dir)
+    report = cr.compare_source(cr.load_source(source), dates, race_ids, codes, records, "2026-03-11")
+    assert report["matched_races"] == 3  # NY-03 is not in our grades
+
+    first, second = report["chambers"]["All"]["series"]
+    # Day one: AL-01 exact, GA tossup exact, AZ unrated by us
+    assert (first["compared"], first["rated"], first["unrated"]) == (3, 2, 1)
+    assert first["exact_pct"] == 1.0 and first["bias"] == 0.0
+    # Day two: AL-01 +2, GA -1, AZ -1 (ours - source, R positive)
+    assert second["exact_pct"] == 0.0
+    assert second["within_one_pct"] == pytest.approx(2 / 3, abs=1e-4)
+    assert second["mean_abs_dev"] == pytest.approx(4 / 3, abs=1e-4)
+    assert second["bias"] == 0.0
+
+    confusion = np.array(report["chambers"]["All"]["confusion"])
+    assert confusion.shape == (cr.N_CAT, cr.N_CAT + 1) and confusion.sum() == 3
+    assert confusion[cr.CATEGORY_CODES["Lean R"], cr.CATEGORY_CODES["Solid R"]] == 1
+
+    assert [d["race_id"] for d in report["deviations"]] == ["H2026AL01", "G2026AZ01", "S2026GA01"]
+    assert report["deviations"][0]["diff"] == 2
+    assert set(report["chambers"]) == {"All", "House", "Senate", "Governor"}
+
+
+def test_chamber_filter(grades_dir, source):
+    dates, race_ids, codes, records = cr.load_grades_history(grades_dir)
+    report = cr.compare_source(cr.load_source(source), dates, race_ids, codes, records,
+                               "2026-03-10", chamber="Senate")
+    assert report["matched_races"] == 1
+    assert set(report["chambers"]) == {"All", "Senate"}
+    assert [r["compared"] for r in report["chambers"]["All"]["series"]] == [1, 1]
+    assert report["deviations"] == []  # GA was a Tossup for both on the 10th
+
+
+def test_main_writes_json_and_csv(grades_dir, source, tmp_path, capsys):
+    out_json, out_csv = tmp_path / "report.json", tmp_path / "agreement.csv"
+    cr.main(["--source", str(source), "--grades-dir", str(grades_dir),
+             "--json", str(out_json), "--csv", str(out_csv)])
+    assert "PUNDIT vs MARKET GRADES (2026-03-11)" in capsys.readouterr().out
+
+    report = json.loads(out_json.read_text())
+    assert report["our_columns"][-1] == "Unrated"
+    assert report["sources"]["pundit"]["detail_date"] == "2026-03-11"
+    with open(out_csv, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == 4 * len(DAYS)  # All + three chambers, per date
+
+    with pytest.raises(SystemExit, match="No grades file"):
+        cr.main(["--source", str(source), "--grades-dir", str(grades_dir), "--date", "2026-01-01", "--quiet"])
@@ -0,0 +1,93 @@
+"""The NumPy grading core: byte-identical grades to the baseline grader on
+the synthetic markets, and agreement with the pandas adapters the analysis
+tools still use."""
+
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import grade_markets as gm
+from conftest import AS_OF
+
+# grade_markets.py as of the baseline commit (c6a370b, before the fetch and
+# grading rewrites), run against mock_kalshi over
+# synth_markets.generate(SYNTH_CONTRACTS, seed=SYNTH_SEED) with today()
+# frozen at AS_OF. Regenerate it only for an intended change to the grades.
+BASELINE_GRADES = Path(__file__).resolve().parent / "fixtures" / "baseline_grades.json"
+
+
+def with_features(columns, seed=3):
+    """The synthetic markets plus order-book depth and VWAP columns, each
+    missing for some contracts."""
+    rng = np.random.default_rng(seed)
+    n = len(columns)
+    depth = np.where(rng.random(n) < 0.2, np.nan, rng.integers(0, 5000, n).astype(float))
+    vwap = np.where(rng.random(n) < 0.5, np.nan, np.clip(columns["last_price"] + rng.normal(0, 4, n), 1, 99))
+    return columns.assign(depth=depth, vwap=vwap)
+
+
+def test_grades_are_byte_identical_to_the_baseline_grader(mock, synth):
+    _, kalshi_ids = synth
+    markets, race_event, race_urls = gm.pull_all_markets(kalshi_ids, workers=4, as_of=AS_OF)
+    races = gm.grade_races(markets, race_event, race_urls, AS_OF, log=None)
+    assert gm.serialize_grades(gm.grades_output(races, AS_OF)).encode() == BASELINE_GRADES.read_bytes()
+
+
+@pytest.fixture(params=["plain", "features"])
+def markets(request, synth_columns):
+    return synth_columns if request.param == "plain" else with_features(synth_columns)
+
+
+def test_numpy_core_matches_pandas_adapters(markets, synth):
+    _, kalshi_ids = synth
+    rated, unrated, _ = gm.price_races(markets, kalshi_ids, AS_OF, log=None)
+
+    contracts = gm.build_contract_table(markets.to_frame(), kalshi_ids)
+    results = gm.get_republican_win_pct(gm.compute_kalshi_probabilities(contracts), contracts)
+    frame = gm.compute_margins_and_ratings(results[results["kalshi"].notna()].copy(), AS_OF)
+    frame = frame.sort_values("race_id")
+
+    np.testing.assert_array_equal(rated["race_id"], frame["race_id"])
+    for col in ["kalshi", "kalshi_liq", "volume_pct", "spread_pct", "oi_pct", "kalshi_shrunk"]:
+        np.testing.assert_array_equal(rated[col], frame[col].to_numpy(dtype=float), err_msg=col)
+    np.testing.assert_array_equal(rated["margin"], frame["margin"].to_numpy(dtype=float, na_value=np.nan))
+    assert list(rated["rating"]) == list(frame["rating"])
+
+    thin = results[results["kalshi"].isna()].sort_values("race_id")
+    np.testing.assert_array_equal(unrated["race_id"], thin["race_id"])
+    np.testing.assert_array_equal(unrated["raw_r_pct"], thin["raw_r_pct"].to_numpy(dtype=float))
+
+
+def test_features_change_the_grades(synth_columns, synth):
+    _, kalshi_ids = synth
+    plain = gm.grade_races(synth_columns, kalshi_ids, {}, AS_OF, log=None)
+    featured = gm.grade_races(with_features(synth_columns), kalshi_ids, {}, AS_OF, log=None)
+    assert plain != featured
+
+
+def test_duplicate_event_rows_join_like_pandas(synth_columns, synth):
+    """An event listed under two races grades both, as the left join did."""
+    _, kalshi_ids = synth
+    ids = kalshi_ids.copy()
+    ids.loc[len(ids)] = ["H2026ZZ01", ids["event_ticker"].iloc[0]]
+    contracts, race_ids = gm.build_contracts(synth_columns, gm.race_event_table(ids))
+    table = gm.build_contract_table(synth_columns.to_frame(), ids)
+
+    assert len(contracts["race"]) == len(table)
+    assert sorted(race_ids[contracts["race"]]) == sorted(table["race_id"])
+
+
+def test_snapshot_round_trip_keeps_feature_columns(synth_columns, synth, gm_env):
+    _, kalshi_ids = synth
+    markets = with_features(synth_columns)
+    race_event = gm.race_event_table(kalshi_ids)
+    path = gm.save_snapshot(markets, race_event, {}, AS_OF, path=gm_env / "snap.npz")
+    loaded, loaded_event, _, as_of = gm.load_snapshot(path)
+
+    assert as_of == AS_OF
+    assert loaded.records() == markets.records()
+    for col in ["depth", "vwap"]:
+        np.testing.assert_array_equal(loaded[col], markets[col])
+    assert gm.grade_races(loaded, loaded_event, {}, AS_OF, log=None) == \
+        gm.grade_races(markets, race_event, {}, AS_OF, log=None)
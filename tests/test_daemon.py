@@ -0,0 +1,93 @@
+"""Daemon mode: per-event input fingerprints, the refresh cadence, and a
+daemon that skips unchanged pulls and publishes when a market moves."""
+
+import json
+import datetime
+
+import pytest
+
+import grade_markets as gm
+from conftest import move_race
+
+
+def rebuilt(markets, reverse=False):
+    """`markets` ingested again from its records, optionally in reverse so
+    every string gets a different code."""
+    records = markets.records()
+    columns = gm.MarketColumns()
+    columns.extend(records[::-1] if reverse else records)
+    return columns
+
+
+def test_fingerprints_ignore_code_order(synth_columns):
+    fps = gm.market_fingerprints(synth_columns)
+    assert set(fps) == synth_columns.event_tickers()
+    assert gm.market_fingerprints(rebuilt(synth_columns)) == fps
+    # Row order within an event is part of the input, so reversing changes
+    # multi-contract events; the hash itself must not depend on code values
+    reversed_fps = gm.market_fingerprints(rebuilt(synth_columns, reverse=True))
+    single = [et for et in fps if (synth_columns["event_ticker"] == et).sum() == 1]
+    assert single and all(reversed_fps[et] == fps[et] for et in single)
+
+
+def test_fingerprints_change_only_for_moved_events(synth_columns):
+    fps = gm.market_fingerprints(synth_columns)
+    records = synth_columns.records()
+    records[0]["yes_bid"] += 1
+    moved = gm.MarketColumns()
+    moved.extend(records)
+    after = gm.market_fingerprints(moved)
+    assert {et for et in fps if after[et] != fps[et]} == {records[0]["event_ticker"]}
+
+    with_depth = synth_columns.assign(depth=[1.0] * len(synth_columns))
+    assert gm.market_fingerprints(with_depth) != fps
+
+
+@pytest.mark.parametrize("days_left, expected", [(0, 300), (7, 300), (8, 900), (30, 900), (31, 1800), (400, 1800)])
+def test_daemon_interval_follows_the_cadence(days_left, expected):
+    assert gm.daemon_interval(gm.ELECTION_DAY - datetime.timedelta(days=days_left)) == expected
+
+
+def test_daemon_skips_unchanged_pulls_and_publishes_moves(live, gm_env, monkeypatch, capsys):
+    server, _ = live
+    priced = []
+    price_races = gm.price_races
+    monkeypatch.setattr(gm, "price_races", lambda *a, **kw: priced.append(1) or price_races(*a, **kw))
+
+    waits = []
+
+    def sleep(seconds):
+        waits.append(seconds)
+        if len(waits) == 2:  # between the second and third refresh
+            move_race(server, json.loads((gm_env / "grades" / "latest.json").read_text()))
+            for snapshot in (gm_env / "snapshots").iterdir():
+                snapshot.rename(snapshot.with_name("earlier-" + snapshot.name))
+
+    monkeypatch.setattr(gm.time, "sleep", sleep)
+    gm.main(["--daemon", "--max-runs", "3", "--interval", "120", "--draws", "0", "--workers", "4"])
+
+    out = capsys.readouterr().out
+    assert "No market inputs changed since the last pull" in out
+    assert f"1 of {len(server.markets)} events changed since the last pull" in out
+    assert len(priced) == 2  # the unchanged refresh stopped before grading
+    assert len(waits) == 2 and all(0 < w <= 120 for w in waits)
+    assert len(list((gm_env / "snapshots").iterdir())) == 2
+    assert len([p for p in (gm_env / "changes").iterdir() if p.name != "feed.json"]) == 1
+    assert "(1 of 2 refreshes published)" in out
+
+
+def test_daemon_survives_a_failed_refresh(live, monkeypatch, capsys):
+    calls = []
+    run_live = gm.run_live
+
+    def flaky(args, resume=False, state=None):
+        calls.append(resume)
+        if len(calls) == 1:
+            raise RuntimeError("Kalshi is down")
+        return run_live(args, resume=resume, state=state)
+
+    monkeypatch.setattr(gm, "run_live", flaky)
+    monkeypatch.setattr(gm.time, "sleep", lambda s: None)
+    gm.main(["--daemon", "--max-runs", "2", "--resume", "--draws", "0", "--workers", "4"])
+    assert calls == [True, False]  # only the first refresh resumes
+    assert "refresh failed: RuntimeError('Kalshi is down')" in capsys.readouterr().err
@@ -0,0 +1,117 @@
+"""Grade deltas: the patch round-trip, its digest checks, and what a live
+run publishes when its grades move and when they do not."""
+
+import copy
+import json
+
+import pytest
+
+import grade_markets as gm
+from conftest import move_race
+
+
+def grades(date, races):
+    return gm.grades_output(races, gm.datetime.date.fromisoformat(date))
+
+
+@pytest.fixture
+def pair(synth_columns, synth):
+    """Two consecutive grades payloads: prices moved in a few races, one
+    race dropped and the second run a day later."""
+    _, kalshi_ids = synth
+    before = gm.grade_races(synth_columns, kalshi_ids, {}, gm.datetime.date(2026, 3, 10), log=None)
+    after = copy.deepcopy(before)
+    for r in after[:5]:
+        r["margin"] = None if r["margin"] is None else r["margin"] + 6
+        r["grade"] = "A" if r["grade"] != "A" else "B"
+    del after[7]
+    after.append({**after[0], "race_id": "H2026ZZ99", "label": "ZZ-99"})
+    return grades("2026-03-10", before), grades("2026-03-11", after)
+
+
+def test_delta_round_trip_is_byte_identical(pair, gm_env):
+    previous, current = pair
+    path = gm.write_delta(previous, current, "r1", gm.change_events(previous, current))
+    with open(path) as f:
+        delta = json.load(f)
+    rebuilt = gm.apply_delta(previous, delta)
+    assert gm.serialize_grades(rebuilt) == gm.serialize_grades(current)
+
+    base = gm_env / "base.json"
+    base.write_text(gm.serialize_grades(previous))
+    assert gm.reconstruct_grades(base, [path]) == current
+
+
+def test_apply_delta_checks_both_digests(pair):
+    previous, current = pair
+    delta = json.loads(json.dumps({
+        "run": "r1",
+        "from": {"date": previous["date"], "sha256": gm.grades_digest(previous)},
+        "to": {"date": current["date"], "sha256": gm.grades_digest(current)},
+        "patch": gm.diff_grades(previous, current),
+    }))
+    other = copy.deepcopy(previous)
+    other["races"][0]["grade"] = "F" if other["races"][0]["grade"] != "F" else "A"
+    with pytest.raises(ValueError, match="does not apply"):
+        gm.apply_delta(other, delta)
+
+    delta["to"]["sha256"] = "0" * 64
+    with pytest.raises(ValueError, match="did not reproduce"):
+        gm.apply_delta(previous, delta)
+
+
+def test_change_events_report_what_moved(pair):
+    previous, current = pair
+    kinds = {e["type"] for e in gm.change_events(previous, current)}
+    assert {"grade", "added", "removed"} <= kinds
+    assert gm.change_events(previous, previous) == []
+
+
+def test_live_runs_rewrite_the_dated_file_log_deltas_and_skip_no_ops(live, gm_env):
+    server, run = live
+    grades_dir, changes_dir = gm_env / "grades", gm_env / "changes"
+
+    assert run()
+    [dated] = grades_dir.glob("????-??-??.json")
+    first = dated.read_bytes()
+    assert (grades_dir / "latest.json").read_bytes() == first
+    assert not (grades_dir / "latest.json").is_symlink()
+    assert not changes_dir.exists()
+
+    # Nothing moved: no snapshot, delta, feed or history row
+    snapshots = sorted((gm_env / "snapshots").iterdir())
+    assert not run()
+    assert sorted((gm_env / "snapshots").iterdir()) == snapshots
+    assert len(gm.GradesHistory()) == len(json.loads(first)["races"])
+
+    # A price moves: the dated file, latest.json and the day's API
+    # artifacts all move to the new grades, and a delta logs the change
+    moved = move_race(server, json.loads(first))
+    for snapshot in (gm_env / "snapshots").iterdir():
+        snapshot.rename(snapshot.with_name("earlier-" + snapshot.name))  # runs share a minute here
+    assert run()
+    latest = (grades_dir / "latest.json").read_bytes()
+    assert latest != first and dated.read_bytes() == latest
+    api = json.loads((grades_dir / "api" / dated.stem / "all.json").read_text())
+    assert api["races"] == json.loads(latest)["races"]
+    [delta] = [p for p in changes_dir.iterdir() if p.name != "feed.json"]
+    feed = json.loads((changes_dir / "feed.json").read_text())
+    assert any(e["race_id"] == moved["race_id"] for e in feed["changes"])
+
+    base = gm_env / "first.json"
+    base.write_bytes(first)
+    assert gm.serialize_grades(gm.reconstruct_grades(base, [delta])).encode() == latest
+
+
+def test_output_dir_keeps_changes_out_of_the_repo_tree(live, gm_env):
+    server, run = live
+    out = gm_env / "elsewhere"
+    assert run("--output-dir", str(out))
+    move_race(server, json.loads((out / "latest.json").read_text()))
+    for snapshot in (out / "snapshots").iterdir():
+        snapshot.rename(snapshot.with_name("earlier-" + snapshot.name))
+    assert run("--output-dir", str(out))
+
+    assert not (gm_env / "changes").exists()
+    assert (out / "changes" / "feed.json").exists()
+    assert len(list((out / "changes").iterdir())) == 2
@@ -0,0 +1,89 @@
+"""Order-book depth: the depth measure, the short-lived book cache and the
+depth column a --depth pull adds to the markets."""
+
+import json
+
+import numpy as np
+import pytest
+
+import grade_markets as gm
+from conftest import AS_OF
+
+
+def book(yes, no):
+    return {"yes": yes, "no": no}
+
+
+@pytest.mark.parametrize("yes, no, expected", [
+    ([[40, 10], [44, 5], [45, 20]], [[50, 7], [53, 1]], 8),  # thinner side is NO
+    ([[30, 99], [40, 1]], [[55, 3]], 1),  # 30 is outside the 5-cent window
+    ([[40, 10]], [], 0),
+    ([], [[55, 3]], 0),
+])
+def test_book_depth(yes, no, expected):
+    assert gm.book_depth(book(yes, no)) == expected
+
+
+@pytest.fixture
+def two_sided(synth_columns):
+    two = (synth_columns["yes_bid"] > 0) & (synth_columns["yes_ask"] > 0)
+    return sorted(set(synth_columns["ticker"][two]))
+
+
+def orderbook_requests(server):
+    return server.stats["endpoints"].get("orderbook", {}).get("requests", 0)
+
+
+def test_fetch_book_depth_uses_fresh_cached_books(mock, two_sided):
+    depth = gm.fetch_book_depth(two_sided, workers=4)
+    assert orderbook_requests(mock) == len(two_sided)
+    t = two_sided[0]
+    _, body, _, _ = mock.handle(f"/markets/{t}/orderbook", {})
+    assert depth[t] == gm.book_depth({"yes": body["orderbook"]["yes"], "no": body["orderbook"]["no"]})
+
+    mock.reset_stats()
+    assert gm.fetch_book_depth(two_sided, workers=4) == depth
+    assert orderbook_requests(mock) == 0
+
+    cache = json.loads(gm.ORDERBOOK_CACHE_PATH.read_text())
+    for t in two_sided[:4]:
+        cache[t]["fetched_at"] -= gm.ORDERBOOK_CACHE_TTL + 1
+    gm.ORDERBOOK_CACHE_PATH.write_text(json.dumps(cache))
+    mock.reset_stats()
+    gm.fetch_book_depth(two_sided, workers=4)
+    assert orderbook_requests(mock) == 4
+
+
+def test_add_book_depth_only_for_two_sided_contracts(mock, synth_columns, two_sided, monkeypatch):
+    monkeypatch.setattr(gm.time, "sleep", lambda s: None)  # skip the retry passes' backoff
+    missing = two_sided[0]
+    del mock.by_ticker[missing]  # its book 404s
+    markets = gm.add_book_depth(synth_columns, workers=4)
+
+    assert "depth" not in synth_columns and "depth" in markets
+    depth = markets["depth"]
+    tickers = markets["ticker"]
+    is_two = np.isin(tickers, two_sided)
+    assert np.isnan(depth[~is_two]).all()
+    assert np.isnan(depth[tickers == missing]).all()
+    assert not np.isnan(depth[is_two & (tickers != missing)]).any()
+    assert missing in gm._metrics.failed["orderbook"]
+
+
+def test_depth_ranks_fall_back_to_the_spread_rank():
+    depth = np.array([10.0, 200.0, np.nan, 50.0, 7.0])
+    two_sided = np.array([True, True, True, False, True])
+    race_type = np.array([0, 0, 0, 0, 1])
+    spread_pct = np.array([0.1, 0.2, 0.3, 0.4, 0.5])
+    ranks = gm.depth_ranks(depth, two_sided, race_type, spread_pct)
+    assert ranks[2] == 0.3  # unfetched book keeps its spread rank
+    assert ranks[3] < ranks[0] < ranks[1]  # one-sided ranks as zero depth
+    assert ranks[4] == gm.percentile_ranks(np.array([7.0]), np.array([1]))[0]
+
+
+def test_depth_changes_the_liquidity_scores(mock, synth_columns, synth):
+    _, kalshi_ids = synth
+    plain = gm.grade_races(synth_columns, kalshi_ids, {}, AS_OF, log=None)
+    deep = gm.grade_races(gm.add_book_depth(synth_columns, workers=4), kalshi_ids, {}, AS_OF, log=None)
+    assert [r["race_id"] for r in plain] == [r["race_id"] for r in deep]
+    assert [r["liquidity_score"] for r in plain] != [r["liquidity_score"] for r in deep]
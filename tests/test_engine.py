@@ -0,0 +1,80 @@
+"""grade_races as an importable engine: no hidden inputs, no mutation of
+its arguments, and identical results from concurrent calls."""
+
+import copy
+import datetime
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import grade_markets as gm
+from conftest import AS_OF
+
+DATES = [AS_OF + datetime.timedelta(days=d) for d in (0, 30, 90, 180, 230)]
+
+
+@pytest.fixture
+def inputs(synth_columns, synth):
+    _, kalshi_ids = synth
+    urls = {rid: f"https://kalshi.com/markets/{rid.lower()}" for rid in kalshi_ids["race_id"][::2]}
+    return synth_columns.assign(vwap=synth_columns["last_price"]), kalshi_ids, urls
+
+
+def test_arguments_are_not_mutated(inputs):
+    markets, kalshi_ids, urls = inputs
+    before = (markets.records(), copy.deepcopy(markets.extra), kalshi_ids.copy(), dict(urls))
+    gm.grade_races(markets, kalshi_ids, urls, AS_OF, log=None)
+
+    assert markets.records() == before[0]
+    assert markets.extra.keys() == before[1].keys()
+    assert all((markets.extra[k] == v).all() for k, v in before[1].items())
+    assert kalshi_ids.equals(before[2])
+    assert urls == before[3]
+
+
+def test_results_depend_only_on_the_arguments(inputs, capsys):
+    markets, kalshi_ids, urls = inputs
+    metrics = gm._metrics
+    first = gm.grade_races(markets, kalshi_ids, urls, AS_OF, log=None)
+    assert gm.grade_races(markets, kalshi_ids, urls, AS_OF, log=None) == first
+    assert capsys.readouterr().out == ""
+    assert gm._metrics is metrics and metrics.stages == []  # the run's metrics are untouched
+
+    rated = {r["race_id"]: r for r in first if "kalshi_url" in r}  # auto-Solid records carry no URL
+    assert all(rated[rid]["kalshi_url"] == url for rid, url in urls.items() if rid in rated)
+    assert all(r["kalshi_url"] is None for rid, r in rated.items() if rid not in urls)
+
+    later = gm.grade_races(markets, kalshi_ids, urls, DATES[-1], log=None)
+    assert [r["margin"] for r in later] != [r["margin"] for r in first]  # as_of is an input
+
+
+def test_log_receives_progress_lines(inputs):
+    markets, kalshi_ids, urls = inputs
+    lines = []
+    gm.grade_races(markets, kalshi_ids, urls, AS_OF, log=lambda *a, **kw: lines.append(a[0]))
+    assert any(line.startswith("Computing margins") for line in lines)
+    assert any("Grade cutoffs" in line for line in lines)
+
+
+def test_race_table_can_be_any_mapping_of_columns(inputs):
+    markets, kalshi_ids, urls = inputs
+    as_dict = {col: kalshi_ids[col].to_numpy(dtype=object) for col in ["race_id", "event_ticker"]}
+    assert gm.grade_races(markets, as_dict, urls, AS_OF, log=None) == \
+        gm.grade_races(markets, kalshi_ids, urls, AS_OF, log=None)
+    assert all(r.get("kalshi_url") is None for r in gm.grade_races(markets, kalshi_ids, None, AS_OF, log=None))
+
+
+def test_concurrent_calls_match_serial_results(inputs):
+    markets, kalshi_ids, urls = inputs
+    serial = {d: gm.grade_races(markets, kalshi_ids, urls, d, log=None) for d in DATES}
+    jobs = DATES * 8
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda d: gm.grade_races(markets, kalshi_ids, urls, d, log=None), jobs))
+    assert all(result == serial[d] for d, result in zip(jobs, results))
+
+
+def test_margins_need_an_explicit_date(inputs):
+    markets, kalshi_ids, _ = inputs
+    rated, _, _ = gm.price_races(markets, kalshi_ids, AS_OF, log=None)
+    with pytest.raises(TypeError):
+        gm.compute_margin_arrays(rated)
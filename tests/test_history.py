@@ -0,0 +1,94 @@
+"""The columnar grades history store: append, crash recovery and the
+memory-mapped read side."""
+
+import datetime
+
+import numpy as np
+import pytest
+
+import grade_markets as gm
+
+DAY1 = datetime.date(2026, 3, 10)
+DAY2 = datetime.date(2026, 3, 11)
+
+
+def race(race_id, grade="B", rating="Lean R", margin=4, **extra):
+    chamber, state, state_name, label = gm.parse_race_id(race_id)
+    return {
+        "race_id": race_id, "event_ticker": f"EV-{race_id}", "kalshi_url": None,
+        "chamber": chamber, "state": state, "state_name": state_name, "label": label,
+        "grade": grade, "liquidity_score": 0.5, "volume_pct": 0.25, "spread_pct": 0.75, "oi_pct": 0.5,
+        "rating": rating, "margin": margin, **extra,
+    }
+
+
+@pytest.fixture
+def history_dir(gm_env):
+    return gm_env / "history"
+
+
+def test_append_and_read_back(history_dir):
+    run0 = gm.append_history([race("H2026AL01"), race("S2026GA01", margin=-2)], DAY1, history_dir=history_dir)
+    run1 = gm.append_history(
+        [race("S2026GA01", grade="A", rating="Tossup", margin=0), race("G2026AZ01", rating=None, margin=None)],
+        DAY2, snapshot="2026-03-11T1000Z.npz", history_dir=history_dir,
+    )
+    assert (run0, run1) == (0, 1)
+
+    h = gm.GradesHistory(history_dir)
+    assert len(h) == 4
+    assert [r["as_of"] for r in h.runs] == ["2026-03-10", "2026-03-11"]
+    assert h.runs[1]["snapshot"] == "2026-03-11T1000Z.npz"
+    assert list(h.races()["race_id"]) == ["H2026AL01", "S2026GA01", "G2026AZ01"]
+
+    margins = h.matrix("margin")
+    np.testing.assert_array_equal(margins, [[4, -2, np.nan], [np.nan, 0, np.nan]])
+    grades = h.matrix("grade")
+    assert grades[1, 1] == gm.GRADE_CODES.index("A")
+    assert np.isnan(h.matrix("rating")[1, 2])
+    assert isinstance(h.column("liquidity_score"), np.memmap)
+
+
+def test_interrupted_append_is_redone(history_dir):
+    gm.append_history([race("H2026AL01")], DAY1, history_dir=history_dir)
+    # A crash after the column writes but before index.json: stray rows
+    for col in gm.HISTORY_COLUMNS:
+        with open(history_dir / f"{col}.bin", "ab") as f:
+            f.write(b"\xff" * 64)
+    gm.append_history([race("H2026AL01", margin=7)], DAY2, history_dir=history_dir)
+
+    h = gm.GradesHistory(history_dir)
+    assert len(h) == 2
+    for col, dtype in gm.HISTORY_COLUMNS.items():
+        assert (history_dir / f"{col}.bin").stat().st_size == 2 * np.dtype(dtype).itemsize
+    np.testing.assert_array_equal(h.matrix("margin")[:, 0], [4, 7])
+
+
+def test_missing_sub_scores_read_as_nan(history_dir):
+    old = race("H2026AL01")
+    for col in ["volume_pct", "spread_pct", "oi_pct"]:
+        del old[col]  # the earliest grades files had no sub-scores
+    gm.append_history([old], DAY1, history_dir=history_dir)
+    assert np.isnan(gm.GradesHistory(history_dir).matrix("oi_pct")[0, 0])
+
+
+def test_empty_store_reads_as_empty(history_dir):
+    h = gm.GradesHistory(history_dir)
+    assert len(h) == 0
+    assert h.column("margin").shape == (0,)
+
+
+def test_backfill_history_follows_output_dir(gm_env):
+    out = gm_env / "elsewhere"
+    out.mkdir()
+    for day, races in [(DAY1, [race("H2026AL01")]), (DAY2, [race("H2026AL01"), race("S2026GA01")])]:
+        (out / f"{day}.json").write_text(gm.serialize_grades(gm.grades_output(races, day)))
+    (out / "latest.json").write_text("{}")
+
+    gm.main(["--backfill-history", "--output-dir", str(out)])
+    gm.main(["--backfill-history", "--output-dir", str(out)])  # already seen: no-op
+
+    assert not (gm_env / "history").exists()
+    h = gm.GradesHistory(out / "history")
+    assert [r["as_of"] for r in h.runs] == ["2026-03-10", "2026-03-11"]
+    assert len(h) == 3
@@ -0,0 +1,117 @@
+"""Run metrics: stage timings, the HTTP counters the fetch layer feeds, the
+sidecar a live run writes and the slow-run check against earlier runs."""
+
+import json
+import datetime
+
+import pytest
+
+import grade_markets as gm
+from conftest import AS_OF
+
+
+def test_stages_are_recorded_in_order_even_on_error(gm_env):
+    metrics = gm.RunMetrics()
+    with metrics.stage("fetch"):
+        pass
+    with pytest.raises(ValueError):
+        with metrics.stage("records"):
+            raise ValueError
+    assert [s["name"] for s in metrics.stages] == ["fetch", "records"]
+    assert all(s["seconds"] >= 0 for s in metrics.stages)
+
+
+def test_http_counters_match_the_server(mock, synth):
+    _, kalshi_ids = synth
+    gm.pull_all_markets(kalshi_ids, workers=4)
+    http = gm._metrics.http
+    assert http["requests"] == http["attempts"] == mock.stats["requests"]
+    assert http["retries"] == http["rate_limited"] == http["errors"] == 0
+    assert http["bytes"] > 0
+
+    body = gm._metrics.to_dict(AS_OF, "live")
+    fetched = sum(kind["pages"] for kind in body["pages"].values())
+    assert fetched == mock.stats["endpoints"]["markets"]["requests"]
+    assert body["rate_control"]["achieved_rps"] is None  # no "fetch" stage was timed
+
+
+def test_grade_races_times_each_stage(synth_columns, synth):
+    _, kalshi_ids = synth
+    metrics = gm.RunMetrics()
+    gm.grade_races(synth_columns, kalshi_ids, {}, AS_OF, metrics=metrics, log=None)
+    assert [s["name"] for s in metrics.stages] == ["probabilities", "aggregation", "margins", "records"]
+
+
+def sidecar(output_dir, date, seconds, mode="live"):
+    path = output_dir / f"{date}.metrics.json"
+    path.write_text(json.dumps({"date": str(date), "mode": mode, "total_seconds": seconds}))
+
+
+def test_slow_run_baseline(gm_env):
+    out = gm_env / "grades"
+    out.mkdir()
+    assert gm.slow_run_baseline(10.0, AS_OF, out) is None
+
+    day = AS_OF - datetime.timedelta(days=20)
+    for i in range(gm.METRICS_BASELINE_RUNS + 3):
+        # The oldest three are slow outliers beyond the window
+        sidecar(out, day + datetime.timedelta(days=i), 100.0 if i < 3 else 10.0 + i)
+    sidecar(out, AS_OF - datetime.timedelta(days=1), 1.0, mode="snapshot")  # offline re-grades don't count
+    sidecar(out, AS_OF, 1000.0)  # nor does today's own earlier sidecar
+
+    recent = [10.0 + i for i in range(3, gm.METRICS_BASELINE_RUNS + 3)]
+    median = sorted(recent)[len(recent) // 2]
+    baseline = gm.slow_run_baseline(median, AS_OF, out)
+    assert baseline == {"runs": gm.METRICS_BASELINE_RUNS, "median_seconds": median, "ratio": 1.0, "slow": False}
+    assert gm.slow_run_baseline(gm.SLOW_RUN_FACTOR * median + 1, AS_OF, out)["slow"]
+
+
+def test_write_metrics_flags_a_slow_live_run(gm_env, capsys, monkeypatch):
+    out = gm_env / "grades"
+    out.mkdir()
+    sidecar(out, AS_OF - datetime.timedelta(days=1), 0.001)
+    metrics = gm.RunMetrics()
+    with metrics.stage("fetch"):
+        pass
+    monkeypatch.setattr(metrics, "_start", metrics._start - 1.0)  # a one-second run
+
+    path = gm.write_metrics(metrics, AS_OF, "live", out)
+    body = json.loads(path.read_text())
+    assert path.name == f"{AS_OF}.metrics.json"
+    assert body["mode"] == "live" and body["baseline"]["slow"]
+    assert "[WARN] run took" in capsys.readouterr().err
+
+    snapshot = gm.write_metrics(gm.RunMetrics(), AS_OF, "snapshot", out)
+    assert "baseline" not in json.loads(snapshot.read_text())
+
+
+def test_cpu_profile_is_saved_with_the_sidecar(gm_env):
+    metrics = gm.RunMetrics(profile="cpu")
+    with metrics.stage("work"):
+        sorted(range(10000), key=lambda i: -i)
+    body = metrics.to_dict(AS_OF, "live", profile_path=gm_env / "run.prof")
+    assert body["profile"]["mode"] == "cpu"
+    assert (gm_env / "run.prof").stat().st_size > 0
+    assert len(body["profile"]["top"]) <= gm.PROFILE_TOP_N
+
+
+def test_memory_profile_records_stage_peaks(gm_env):
+    metrics = gm.RunMetrics(profile="memory")
+    with metrics.stage("alloc"):
+        block = bytearray(4 * 2**20)
+    del block
+    body = metrics.to_dict(AS_OF, "live")
+    assert metrics.stages[0]["peak_mb"] >= 4
+    assert body["profile"]["mode"] == "memory" and body["profile"]["top"]
+    assert not gm.tracemalloc.is_tracing()
+
+
+def test_live_run_writes_its_sidecar(live, gm_env):
+    _, run = live
+    assert run()
+    [path] = (gm_env / "grades").glob("*.metrics.json")
+    body = json.loads(path.read_text())
+    names = [s["name"] for s in body["stages"]]
+    assert names[0] == "fetch" and {"snapshot", "write", "history"} <= set(names)
+    assert body["counts"]["contracts"] > 0 and body["http"]["requests"] > 0
+    assert body["baseline"] is None
@@ -0,0 +1,126 @@
+"""mock_kalshi: the endpoints it replays, the faults it injects and the
+run_fetch harness the bench reports from."""
+
+import operator
+
+import pytest
+
+import grade_markets as gm
+import mock_kalshi
+from conftest import AS_OF
+
+
+@pytest.fixture
+def make(synth):
+    """MockKalshi(**faults) over the synthetic markets, called through
+    handle() without starting its HTTP thread."""
+    markets, _ = synth
+    servers = []
+
+    def make(**faults):
+        servers.append(mock_kalshi.MockKalshi(markets, **faults))
+        return servers[-1]
+
+    yield make
+    for s in servers:
+        s.httpd.server_close()
+
+
+@pytest.fixture
+def server(make):
+    return make(page_size=50)
+
+
+def walk(server, query):
+    """Every record the /markets cursor chain returns for `query`."""
+    out, cursor = [], ""
+    while True:
+        status, body, _, endpoint = server.handle("/markets", {**query, "cursor": cursor})
+        assert (status, endpoint) == (200, "markets")
+        out += body["markets"]
+        cursor = body["cursor"]
+        if not cursor:
+            return out
+
+
+def test_cursor_paging_and_filters(server, synth):
+    markets, _ = synth
+    every = [m["ticker"] for records in markets.values() for m in records]
+    assert [m["ticker"] for m in walk(server, {})] == every
+    assert [m["ticker"] for m in walk(server, {"limit": "7"})] == every
+
+    event = next(et for et, records in markets.items() if len(records) > 2)
+    assert walk(server, {"event_ticker": event}) == markets[event]
+    series = gm.series_ticker_for(event)
+    assert {m["event_ticker"] for m in walk(server, {"series_ticker": series})} == {
+        et for et in markets if gm.series_ticker_for(et) == series
+    }
+    assert server.handle("/exchange/status", {})[0] == 404
+
+
+def test_orderbook_brackets_the_quotes(server, synth):
+    markets, _ = synth
+    m = next(m for records in markets.values() for m in records if m["yes_bid"] and m["yes_ask"])
+    status, body, _, _ = server.handle(f"/markets/{m['ticker']}/orderbook", {})
+    assert status == 200
+    book = body["orderbook"]
+    assert book["yes"][-1][0] == m["yes_bid"]
+    assert book["no"][-1][0] == 100 - m["yes_ask"]
+    assert [p for p, _ in book["yes"]] == sorted(p for p, _ in book["yes"])
+    assert server.handle(f"/markets/{m['ticker']}/orderbook", {})[1] == body  # same book every time
+    assert server.handle("/markets/NOPE/orderbook", {})[0] == 404
+
+
+def test_overlapping_candle_windows_agree(server, synth):
+    markets, _ = synth
+    m = next(m for records in markets.values() for m in records if m["volume"])
+    path = f"/series/{gm.url_series_ticker(m['event_ticker'])}/markets/{m['ticker']}/candlesticks"
+    hour = 3600
+    _, wide, _, endpoint = server.handle(path, {"start_ts": "0", "end_ts": str(10 * hour), "period_interval": "60"})
+    _, tail, _, _ = server.handle(path, {"start_ts": str(6 * hour - 5), "end_ts": str(10 * hour)})
+    assert endpoint == "candles"
+    assert [c["end_period_ts"] for c in wide["candlesticks"]] == [i * hour for i in range(11)]
+    assert tail["candlesticks"] == wide["candlesticks"][6:]
+
+
+def test_injected_faults(make):
+    failing = make(error_rate=1.0)
+    assert failing.handle("/markets", {})[0] == 503
+
+    limited = make(rate_limit=2)
+    statuses = [limited.handle("/markets", {"limit": "1"})[:3] for _ in range(3)]
+    assert [s for s, _, _ in statuses] == [200, 200, 429]
+    assert int(statuses[-1][2]["Retry-After"]) >= mock_kalshi.DEFAULT_RETRY_AFTER
+
+    storm = make(storm_every=10.0, storm_for=10.0)
+    assert storm.handle("/markets", {})[0] == 429
+
+    truncating = make(page_size=50, truncate_rate=1.0)
+    status, body, _, _ = truncating.handle("/markets", {})
+    assert body["has_more"] and not body["cursor"]
+    assert truncating.stats["truncated_pages"] == 1
+
+
+def test_run_fetch_pulls_everything_through_faults(synth, gm_env):
+    markets, kalshi_ids = synth
+    saved = (gm.BASE_URL, gm.SERIES_CACHE_PATH, gm._rate_limiter, gm._session)
+    with mock_kalshi.MockKalshi(markets, page_size=50, error_rate=0.05, truncate_rate=0.3, seed=1) as server:
+        report = mock_kalshi.run_fetch(server, kalshi_ids, workers=4, client_rate=2000, client_max_rate=2000)
+
+    assert report["contracts"]["pulled"] == report["contracts"]["expected"]
+    assert report["events"]["pulled"] == report["events"]["expected"]
+    assert report["truncated_pages"] > 0 and report["status"]["503"] > 0
+    assert report["retries"] >= report["status"]["503"]
+    assert report["race_urls"] > 0
+    assert set(report["endpoints"]) >= {"markets", "series"}
+    assert (gm.BASE_URL, gm.SERIES_CACHE_PATH, gm._rate_limiter, gm._session) == saved
+
+
+def test_snapshot_markets_replays_a_snapshot(synth_columns, synth, gm_env):
+    _, kalshi_ids = synth
+    path = gm.save_snapshot(synth_columns, gm.race_event_table(kalshi_ids), {}, AS_OF)
+    markets, race_event = mock_kalshi.snapshot_markets(path)
+    assert list(race_event["event_ticker"].unique()) == list(markets)
+    replayed = [{k: v for k, v in m.items() if k != "status"} for records in markets.values() for m in records]
+    by_ticker = operator.itemgetter("ticker")
+    assert sorted(replayed, key=by_ticker) == sorted(synth_columns.records(), key=by_ticker)
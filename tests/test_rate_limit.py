@@ -0,0 +1,147 @@
+"""AdaptiveRateLimiter (AIMD), rate-limit header parsing and the retry
+loop in rate_limited_get."""
+
+import email.utils
+
+import pytest
+
+import grade_markets as gm
+import mock_kalshi
+
+NOW = 1_750_000_000.0
+
+
+@pytest.mark.parametrize("value, expected", [
+    (None, None),
+    ("3", 3.0),
+    ("0.5", 0.5),
+    ("-2", 0.0),
+    (str(NOW + 7), 7.0),  # epoch timestamp
+    (email.utils.formatdate(NOW + 30, usegmt=True), 30.0),  # HTTP date
+    ("soon", None),
+])
+def test_header_seconds(value, expected):
+    assert gm._header_seconds(value, now=NOW) == expected
+
+
+def limiter(rate=10.0, **kwargs):
+    return gm.AdaptiveRateLimiter(rate, 1, min_rate=1.0, max_rate=20.0, **kwargs)
+
+
+def test_healthy_responses_raise_the_rate_up_to_the_cap():
+    lim = limiter()
+    lim.feedback(200, 0.05, {})
+    assert lim.rate == pytest.approx(10.0 + gm.RATE_INCREASE / 10.0)
+    for _ in range(5000):
+        lim.feedback(200, 0.05, {})
+    assert lim.rate == 20.0
+
+
+def test_429_cuts_the_rate_once_per_cooldown_and_honours_retry_after(monkeypatch):
+    clock = [100.0]
+    monkeypatch.setattr(gm.time, "monotonic", lambda: clock[0])
+    lim = limiter()
+    lim.feedback(429, 0.05, {"Retry-After": "3"})
+    assert lim.rate == pytest.approx(10.0 * gm.RATE_DECREASE)
+    assert lim._paused_until == pytest.approx(103.0)
+
+    lim.feedback(429, 0.05, {"Retry-After": "3"})  # same burst: no second cut
+    assert lim.rate == pytest.approx(10.0 * gm.RATE_DECREASE)
+
+    clock[0] += gm.RATE_DECREASE_COOLDOWN
+    lim.feedback(429, 0.05, {})
+    assert lim.rate == pytest.approx(10.0 * gm.RATE_DECREASE ** 2)
+    assert lim._paused_until == pytest.approx(clock[0] + gm.RATE_LIMIT_DEFAULT_WAIT)
+    assert lim.summary()["throttled"] == 3
+    assert lim.summary()["decreases"] == 2
+
+
+def test_exhausted_rate_limit_headers_pause_without_cutting_the_rate(monkeypatch):
+    monkeypatch.setattr(gm.time, "monotonic", lambda: 50.0)
+    lim = limiter()
+    lim.feedback(200, 0.05, {"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "4"})
+    assert lim._paused_until == pytest.approx(54.0)
+    assert lim.rate > 10.0
+
+
+def test_latency_spike_cuts_the_rate():
+    lim = limiter()
+    lim.feedback(200, 0.2, {})
+    rate = lim.rate
+    lim.feedback(200, 0.2 * gm.LATENCY_SPIKE_FACTOR + gm.LATENCY_SPIKE_MIN, {})
+    assert lim.rate == pytest.approx(rate * gm.LATENCY_DECREASE)
+
+
+def test_server_errors_hold_the_rate():
+    lim = limiter()
+    lim.feedback(503, 0.05, {})
+    assert lim.rate == 10.0
+
+
+class CountingLimiter(gm.AdaptiveRateLimiter):
+    def __init__(self):
+        super().__init__(2000, 50, max_rate=2000)
+        self.acquired = 0
+        self.statuses = []
+
+    def acquire(self):
+        self.acquired += 1
+        super().acquire()
+
+    def feedback(self, status, latency, headers):
+        self.statuses.append(status)
+        super().feedback(status, latency, headers)
+
+
+@pytest.fixture
+def failing_mock(synth, gm_env, monkeypatch):
+    markets, _ = synth
+    server = mock_kalshi.MockKalshi(markets, error_rate=1.0).start()
+    monkeypatch.setattr(gm, "BASE_URL", server.url)
+    yield server
+    server.stop()
+
+
+def test_5xx_retries_each_take_a_token(failing_mock, monkeypatch):
+    lim = CountingLimiter()
+    monkeypatch.setattr(gm, "_rate_limiter", lim)
+    with pytest.raises(gm.KalshiHTTPError) as err:
+        gm.rate_limited_get("/markets", params={"limit": 10})
+
+    attempts = gm.SERVER_ERROR_RETRIES + 1
+    assert err.value.status == 503
+    assert failing_mock.stats["requests"] == attempts  # urllib3 adds none of its own
+    assert lim.acquired == attempts
+    assert lim.statuses == [503] * attempts
+    assert gm._metrics.http["attempts"] == attempts
+    assert gm._metrics.http["retries"] == attempts - 1
+
+
+def test_429_is_retried_after_retry_after(mock, monkeypatch):
+    lim = CountingLimiter()
+    monkeypatch.setattr(gm, "_rate_limiter", lim)
+    throttles = iter([0.1])  # one 429 (Retry-After: 1), then healthy
+    monkeypatch.setattr(mock, "_throttle", lambda: next(throttles, None))
+
+    body = gm.rate_limited_get("/markets", params={"limit": 10})
+    assert len(body["markets"]) == 10
+    assert lim.statuses == [429, 200]
+    assert lim.acquired == 2
+    assert lim.summary()["paused_s"] == pytest.approx(1.0, abs=0.05)
+    assert gm._metrics.http["rate_limited"] == 1
+
+
+def test_peak_rate_stays_within_kalshis_limit(monkeypatch):
+    """A full bucket at RATE_MAX: no one-second window sees more than
+    KALSHI_READ_LIMIT requests."""
+    clock = [0.0]
+    monkeypatch.setattr(gm.time, "monotonic", lambda: clock[0])
+    monkeypatch.setattr(gm.time, "sleep", lambda s: clock.__setitem__(0, clock[0] + s))
+    lim = gm.AdaptiveRateLimiter(gm.RATE_MAX, gm.REQUEST_BURST)
+    sent = []
+    for _ in range(200):
+        lim.acquire()
+        sent.append(clock[0])
+    worst = max(sum(1 for t in sent if start <= t <= start + 1.0) for start in sent)
+    assert worst <= gm.KALSHI_READ_LIMIT
+    assert gm.RATE_MAX + gm.REQUEST_BURST <= gm.KALSHI_READ_LIMIT
@@ -0,0 +1,134 @@
+"""Column-wise race records and the fast grades serializer against the
+row-at-a-time reference they replaced."""
+
+import json
+import math
+
+import numpy as np
+import pytest
+
+import grade_markets as gm
+from conftest import AS_OF
+
+
+def reference_records(rated, unrated, race_event, race_urls):
+    """One dict per row, graded and rounded with the scalar helpers."""
+    all_liq = np.concatenate([rated["kalshi_liq"], unrated["kalshi_liq"]])
+    thresholds = gm.compute_grade_thresholds(all_liq)
+    tickers = dict(zip(race_event["race_id"], race_event["event_ticker"]))
+
+    races = []
+    for row in rated:
+        rid = str(row["race_id"])
+        chamber, state, state_name, label = gm.parse_race_id(rid)
+        liq, margin = float(row["kalshi_liq"]), float(row["margin"])
+        races.append({
+            "race_id": rid,
+            "event_ticker": tickers.get(rid),
+            "kalshi_url": race_urls.get(rid),
+            "chamber": chamber,
+            "state": state,
+            "state_name": state_name,
+            "label": label,
+            "grade": gm.composite_to_grade(liq, thresholds),
+            "liquidity_score": round(liq, 3),
+            "volume_pct": None if math.isnan(row["volume_pct"]) else round(float(row["volume_pct"]), 3),
+            "spread_pct": None if math.isnan(row["spread_pct"]) else round(float(row["spread_pct"]), 3),
+            "oi_pct": None if math.isnan(row["oi_pct"]) else round(float(row["oi_pct"]), 3),
+            "rating": row["rating"],
+            "margin": None if math.isnan(margin) else int(margin),
+        })
+    for row in unrated:
+        raw_r = float(row["raw_r_pct"])
+        if gm.AUTO_SOLID_THRESHOLD > raw_r > 100 - gm.AUTO_SOLID_THRESHOLD or math.isnan(raw_r):
+            continue
+        rid = str(row["race_id"])
+        chamber, state, state_name, label = gm.parse_race_id(rid)
+        liq = 0.0 if math.isnan(row["kalshi_liq"]) else float(row["kalshi_liq"])
+        races.append({
+            "race_id": rid,
+            "event_ticker": tickers.get(rid),
+            "chamber": chamber,
+            "state": state,
+            "state_name": state_name,
+            "label": label,
+            "grade": gm.composite_to_grade(liq, thresholds),
+            "liquidity_score": round(liq, 3),
+            "volume_pct": 0,
+            "spread_pct": 0,
+            "oi_pct": 0,
+            "rating": "Solid R" if raw_r >= gm.AUTO_SOLID_THRESHOLD else "Solid D",
+            "margin": None,
+        })
+
+    def sort_key(race):
+        margin = race["margin"] if "kalshi_url" in race else None
+        return gm.CHAMBER_SORT_ORDER.get(race["chamber"], 9), 999 if margin is None else abs(margin)
+
+    return sorted(races, key=sort_key)
+
+
+@pytest.fixture
+def priced(synth_columns, synth):
+    _, kalshi_ids = synth
+    return gm.price_races(synth_columns, kalshi_ids, AS_OF, log=None)
+
+
+def test_records_match_row_reference(priced):
+    rated, unrated, race_event = priced
+    urls = {rid: f"https://kalshi.com/markets/{rid.lower()}" for rid in rated["race_id"][::2].tolist()}
+    races = gm.build_race_records(rated, unrated, race_event, urls, log=None)
+    expected = reference_records(rated, unrated, race_event, urls)
+
+    assert len(races) > 0 and any("kalshi_url" not in r for r in races)
+    assert gm.serialize_grades(gm.grades_output(races, AS_OF)) == \
+        json.dumps(gm.grades_output(expected, AS_OF), indent=2)
+
+
+def test_records_with_missing_values(priced):
+    rated, unrated, race_event = priced
+    rated = rated.copy()
+    rated["margin"][::3] = np.nan
+    rated["volume_pct"][1::4] = np.nan
+    rated["kalshi_liq"][2::5] = np.nan
+    races = gm.build_race_records(rated, unrated, race_event, {}, log=None)
+    expected = reference_records(rated, unrated, race_event, {})
+
+    # NaN != NaN, so compare the JSON text (NaN serializes as NaN either way)
+    assert json.dumps(races) == json.dumps(expected)
+
+
+def test_grade_scores_matches_composite_to_grade():
+    rng = np.random.default_rng(0)
+    scores = np.concatenate([rng.random(500), [np.nan, 0.0, 1.0]])
+    thresholds = gm.compute_grade_thresholds(scores[:100])
+    scores = np.concatenate([scores, [thresholds[q] for q in (20, 40, 60, 80)]])
+    assert gm.grade_scores(scores, thresholds).tolist() == \
+        [gm.composite_to_grade(s, thresholds) for s in scores]
+
+
+def test_round_values_matches_round_on_ties():
+    values = np.array([0.0005, 0.0015, 0.0025, 1.0005, 2.675, 0.1235, -0.0005, 0.3335, np.nan, 7.0])
+    values = np.concatenate([values, np.random.default_rng(1).random(2000)])
+    expected = [None if math.isnan(v) else round(float(v), 3) for v in values]
+    assert gm.round_values(values, 3) == expected
+
+
+@pytest.mark.parametrize("output", [
+    {"date": "2026-03-11", "total_races": 0, "races": []},
+    {},
+    {"date": "2026-03-11", "races": [
+        {"label": "quote \" slash \\ tab \t", "unicode": "Nuñez – ☃", "n": None, "x": 1.5},
+        {"nested_looking": "},\n      {", "flag": True},
+    ], "meta": {"a": [1, 2], "b": {}}},
+])
+def test_serialize_grades_matches_json_dumps(output):
+    assert gm.serialize_grades(output) == json.dumps(output, indent=2)
+    assert json.loads(gm.serialize_grades(output, compact=True)) == output
+
+
+def test_serialized_synth_grades(synth_columns, synth):
+    _, kalshi_ids = synth
+    output = gm.grades_output(gm.grade_races(synth_columns, kalshi_ids, {}, AS_OF, log=None), AS_OF)
+    assert gm.serialize_grades(output) == json.dumps(output, indent=2)
+    assert json.loads(gm.serialize_grades(output, compact=True)) == output
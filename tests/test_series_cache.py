@@ -0,0 +1,84 @@
+"""The series metadata cache behind the Kalshi URLs: what build_event_urls
+fetches on a cold cache, a warm one, after the TTL and on refresh."""
+
+import json
+
+import pytest
+
+import grade_markets as gm
+
+
+@pytest.fixture
+def events(synth):
+    _, kalshi_ids = synth
+    return list(kalshi_ids["event_ticker"])
+
+
+def series_requests(server):
+    return server.stats["endpoints"].get("series", {}).get("requests", 0)
+
+
+def test_warm_cache_fetches_nothing(mock, events):
+    wanted = {gm.url_series_ticker(et) for et in events}
+    cold = gm.build_event_urls(events, workers=4)
+    assert series_requests(mock) == len(wanted)
+    assert cold[events[0]] == gm.series_url(events[0], mock.series_titles[gm.url_series_ticker(events[0])])
+
+    mock.reset_stats()
+    assert gm.build_event_urls(events, workers=4) == cold
+    assert series_requests(mock) == 0
+    assert set(json.loads(gm.SERIES_CACHE_PATH.read_text())) == wanted
+
+
+def test_expired_entries_are_refetched(mock, events):
+    gm.build_event_urls(events, workers=4)
+    cache = gm.load_series_cache()
+    old = sorted(cache)[:3]
+    for st in old:
+        cache[st]["fetched_at"] -= gm.SERIES_CACHE_TTL_DAYS * 86400 + 60
+    gm.save_series_cache(cache)
+
+    mock.reset_stats()
+    gm.build_event_urls(events, workers=4)
+    assert series_requests(mock) == len(old)
+    assert all(gm.load_series_cache()[st]["fetched_at"] > cache[st]["fetched_at"] for st in old)
+
+
+def test_refresh_drops_listed_series_or_everything(mock, events):
+    gm.build_event_urls(events, workers=4)
+    st = gm.url_series_ticker(events[0])
+    mock.series_titles[st] = "Renamed Race"
+
+    mock.reset_stats()
+    urls = gm.build_event_urls(events, workers=4, refresh=[st])
+    assert series_requests(mock) == 1
+    assert urls[events[0]] == gm.series_url(events[0], "Renamed Race")
+
+    mock.reset_stats()
+    gm.build_event_urls(events, workers=4, refresh=True)
+    assert series_requests(mock) == len({gm.url_series_ticker(et) for et in events})
+
+
+def test_unknown_series_is_cached_as_no_url(mock, events):
+    st = gm.url_series_ticker(events[0])
+    del mock.series_titles[st]
+    assert gm.build_event_urls(events, workers=4)[events[0]] is None
+    assert gm.load_series_cache()[st]["title"] is None
+
+    mock.reset_stats()
+    gm.build_event_urls(events, workers=4)
+    assert series_requests(mock) == 0  # a 404 is an answer, not a failure
+
+
+def test_load_series_cache_sees_rewrites(gm_env):
+    path = gm_env / "series.json"
+    assert gm.load_series_cache(path) == {}
+    gm.save_series_cache({"A": {"title": "One", "fetched_at": 1}}, path)
+    assert gm.load_series_cache(path)["A"]["title"] == "One"
+
+    first = gm.load_series_cache(path)
+    first["B"] = {}  # callers get their own copy of the memo
+    assert "B" not in gm.load_series_cache(path)
+
+    gm.save_series_cache({"A": {"title": "Two", "fetched_at": 2}}, path)
+    assert gm.load_series_cache(path)["A"]["title"] == "Two"
@@ -0,0 +1,79 @@
+"""The chamber-control Monte Carlo: per-race marginals, holdover seats and
+races without a usable price."""
+
+import numpy as np
+import pytest
+
+import grade_markets as gm
+from conftest import AS_OF
+
+DRAWS = 200_000
+
+
+def seat_moments(chamber):
+    """Mean and standard deviation of a chamber's simulated R seats."""
+    counts = np.array(chamber["histogram"]["counts"], dtype=float)
+    seats = np.arange(len(counts)) + chamber["histogram"]["start"]
+    mean = (seats * counts).sum() / counts.sum()
+    return mean, np.sqrt(((seats - mean) ** 2 * counts).sum() / counts.sum())
+
+
+def test_single_race_chambers_reproduce_their_probability():
+    race_ids = ["H2026AL01", "S2026GA01", "G2026AZ01"]
+    r_prob = [0.2, 0.5, 0.85]
+    sim = gm.simulate_control(race_ids, r_prob, draws=DRAWS)
+    for rid, p in zip(race_ids, r_prob):
+        chamber = sim["chambers"][gm.CHAMBER_NAMES[rid[0]]]
+        won = seat_moments(chamber)[0] - chamber.get("holdover_r", 0)
+        assert won == pytest.approx(p, abs=4 * np.sqrt(p * (1 - p) / DRAWS))
+
+
+def test_expected_seats_are_the_sum_of_race_probabilities():
+    """Correlation moves the spread of the seat count, never its mean."""
+    rng = np.random.default_rng(0)
+    states = ["AL", "AZ", "CA", "GA", "NY", "TX"]
+    race_ids = [f"H2026{states[i % 6]}{i:02d}" for i in range(60)]
+    r_prob = rng.uniform(0.02, 0.98, len(race_ids))
+    house = gm.simulate_control(race_ids, r_prob, draws=DRAWS)["chambers"]["House"]
+    mean, sd = seat_moments(house)
+    assert mean == pytest.approx(r_prob.sum(), abs=4 * sd / np.sqrt(DRAWS))
+    assert house["races"] == 60 and house["unpriced"] == []
+
+
+def test_holdover_seats_are_applied(monkeypatch):
+    monkeypatch.setitem(gm.CHAMBER_CONTROL, "Senate", {"seats": 10, "holdover_r": 4, "r_control": 6})
+    senate = gm.simulate_control(["S2026GA01", "S2026AZ01", "S2026NC01"], [0.9999] * 3,
+                                 draws=10_000)["chambers"]["Senate"]
+    assert senate["histogram"]["start"] >= 4
+    assert senate["r_seats"]["p50"] == 7
+    assert senate["holdover_d"] == 3
+    assert senate["r_control"] == 1.0 and senate["d_control"] == 0.0
+
+
+def test_unpriced_races_are_flagged_not_simulated(monkeypatch):
+    monkeypatch.setitem(gm.CHAMBER_CONTROL, "Senate", {"seats": 10, "holdover_r": 5, "r_control": 6})
+    sim = gm.simulate_control(["S2026GA01", "S2026AZ01", "H2026AL01"], [np.nan, 0.0001, 0.7], draws=10_000)
+    senate = sim["chambers"]["Senate"]
+    assert senate["unpriced"] == ["S2026GA01"]
+    assert senate["races"] == 1
+    assert senate["holdover_d"] == 10 - 5 - 1 - 1
+    # Georgia alone decides control: no coin flip, just the range
+    assert senate["r_control"] is None and senate["d_control"] is None
+    assert senate["r_control_range"] == pytest.approx([0.0, 1.0], abs=1e-3)
+    assert sim["chambers"]["House"]["unpriced"] == []
+
+
+def test_race_win_probabilities(synth_columns, synth):
+    _, kalshi_ids = synth
+    rated, unrated, _ = gm.price_races(synth_columns, kalshi_ids, AS_OF, log=None)
+    race_ids, r_prob = gm.race_win_probabilities(rated, unrated, kalshi_ids)
+    index = {rid: i for i, rid in enumerate(race_ids)}
+
+    assert list(race_ids) == sorted(set(kalshi_ids["race_id"]))
+    for row in rated[:20]:
+        expected = row["kalshi"] if np.isnan(row["kalshi_shrunk"]) else row["kalshi_shrunk"]
+        assert r_prob[index[row["race_id"]]] == pytest.approx(expected / 100)
+    for row in unrated:
+        assert np.isnan(r_prob[index[row["race_id"]]]) == np.isnan(row["raw_r_pct"])
+    unpriced = set(race_ids) - set(rated["race_id"]) - set(unrated["race_id"][~np.isnan(unrated["raw_r_pct"])])
+    assert all(np.isnan(r_prob[index[rid]]) for rid in unpriced)
@@ -0,0 +1,53 @@
+"""Raw snapshots: what a live run archives re-grades offline to the same
+grades, and --output-dir keeps both kinds of run out of src/data."""
+
+import json
+
+import numpy as np
+
+import grade_markets as gm
+from conftest import AS_OF
+
+
+def test_snapshot_round_trip(synth_columns, synth, gm_env):
+    _, kalshi_ids = synth
+    race_event = gm.race_event_table(kalshi_ids)
+    urls = {rid: f"https://kalshi.com/markets/{rid.lower()}" for rid in race_event["race_id"][::3]}
+    path = gm.save_snapshot(synth_columns, race_event, urls, AS_OF)
+
+    assert path.parent == gm_env / "snapshots" and path.suffix == ".npz"
+    markets, loaded_event, loaded_urls, as_of = gm.load_snapshot(path)
+    assert as_of == AS_OF
+    assert markets.records() == synth_columns.records()
+    np.testing.assert_array_equal(loaded_event["race_id"], race_event["race_id"])
+    np.testing.assert_array_equal(loaded_event["event_ticker"], race_event["event_ticker"])
+    assert {k: v for k, v in loaded_urls.items() if v} == urls
+
+
+def test_snapshot_paths_expand_directories(gm_env):
+    d = gm_env / "snaps"
+    d.mkdir()
+    for name in ["b.npz", "a.npz", "notes.txt"]:
+        (d / name).touch()
+    single = gm_env / "c.npz"
+    assert gm.snapshot_paths([d, single]) == [d / "a.npz", d / "b.npz", single]
+
+
+def test_from_snapshot_regrades_a_live_run(live, gm_env, monkeypatch):
+    _, run = live
+    out = gm_env / "live"
+    assert run("--output-dir", str(out))
+    [snapshot] = (out / "snapshots").iterdir()
+    live_grades = json.loads((out / "latest.json").read_text())
+
+    # kalshi_ids.csv changing later does not change what a snapshot grades
+    monkeypatch.setattr(gm, "KALSHI_IDS_PATH", gm_env / "missing.csv")
+    offline = gm_env / "offline"
+    gm.main(["--from-snapshot", str(out / "snapshots"), "--output-dir", str(offline), "--draws", "0"])
+
+    [dated] = offline.glob("????-??-??.json")
+    assert json.loads(dated.read_text()) == live_grades
+    assert not (offline / "latest.json").exists()
+    assert (offline / f"{dated.stem}.metrics.json").exists()
+    for name in ["snapshots", "history", "changes", "simulations", "grades"]:
+        assert not (gm_env / name).exists(), name
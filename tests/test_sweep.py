@@ -0,0 +1,82 @@
+"""sweep_params: grid parsing, and the broadcast re-grade matching the
+grader's own ratings at the default parameters."""
+
+import csv
+
+import numpy as np
+import pytest
+
+import grade_markets as gm
+import sweep_params as sp
+from conftest import AS_OF
+
+
+def test_parse_values():
+    assert sp.parse_values("0.1,0.25") == [0.1, 0.25]
+    assert sp.parse_values("0.1:0.5:0.1") == [0.1, 0.2, 0.3, 0.4, 0.5]
+    assert sp.parse_values("1:1:0.5") == [1.0]
+
+
+def test_grid_fills_weight_oi_and_drops_invalid_sets():
+    grid = sp.build_grid(["weight_volume=0.2,0.5,0.9", "weight_spread=0.3"])
+    col = {name: grid[:, i] for i, name in enumerate(sp.PARAM_NAMES)}
+    assert sorted(col["weight_volume"]) == [0.2, 0.5]  # 0.9 + 0.3 leaves no room for OI
+    np.testing.assert_allclose(col["weight_volume"] + col["weight_spread"] + col["weight_oi"], 1.0)
+    assert (col["shrinkage_alpha"] == gm.SHRINKAGE_ALPHA).all()
+
+    oi = round(1 - gm.WEIGHT_VOLUME - gm.WEIGHT_SPREAD, 10)
+    swept = sp.build_grid([f"weight_oi={oi},{oi + 0.1}"])  # explicit OI: only sets summing to 1
+    assert list(swept[:, sp.P["weight_oi"]]) == [oi]
+
+    lt = sp.build_grid(["last_trade_weight_min=0.1,0.9", "last_trade_weight_max=0.5"])
+    assert (lt[:, sp.P["last_trade_weight_min"]] <= lt[:, sp.P["last_trade_weight_max"]]).all()
+
+    with pytest.raises(SystemExit, match="Unknown parameter"):
+        sp.build_grid(["weight_vibes=1"])
+
+
+def graded_scale(path):
+    """The grader's ratings for a snapshot on the sweep's -3..+3 scale."""
+    markets, race_event, race_urls, as_of = gm.load_snapshot(path)
+    races = gm.grade_races(markets, race_event, race_urls, as_of, log=None)
+    return {r["race_id"]: sp.RATING_SCALE.get(r["rating"], np.nan) for r in races}
+
+
+@pytest.mark.parametrize("features", [False, True], ids=["plain", "depth+vwap"])
+def test_defaults_reproduce_the_graders_ratings(synth_columns, synth, gm_env, features):
+    _, kalshi_ids = synth
+    markets = synth_columns
+    if features:
+        rng = np.random.default_rng(3)
+        n = len(markets)
+        vwap = np.where(rng.random(n) < 0.5, np.nan, np.clip(markets["last_price"] + rng.integers(-5, 6, n), 1, 99))
+        markets = markets.assign(depth=rng.integers(0, 2000, n), vwap=vwap)
+    path = gm.save_snapshot(markets, gm.race_event_table(kalshi_ids), {}, AS_OF)
+
+    snap = sp.prepare_snapshot(path)
+    assert (snap["depth_pct"] is not None) == features
+    [swept] = sp.rate_snapshot(snap, sp.build_grid([]))
+    expected = graded_scale(path)
+    np.testing.assert_array_equal(swept, [expected.get(rid, np.nan) for rid in snap["race_ids"]])
+    assert np.isfinite(swept).sum() > len(swept) / 2
+
+
+def test_main_writes_every_parameter_set(synth_columns, synth, gm_env, capsys):
+    _, kalshi_ids = synth
+    path = gm.save_snapshot(synth_columns, gm.race_event_table(kalshi_ids), {}, AS_OF)
+    reference = gm_env / "reference.json"
+    races = gm.grade_races(synth_columns, kalshi_ids, {}, AS_OF, log=None)
+    reference.write_text(gm.serialize_grades(gm.grades_output(races, AS_OF)))
+    out = gm_env / "sweep.csv"
+
+    sp.main([str(path.parent), "--param", "shrinkage_alpha=1.0,1.2," + str(gm.SHRINKAGE_ALPHA),
+             "--reference", str(reference), "--processes", "1", "--out", str(out)])
+
+    with open(out, newline="") as f:
+        rows = list(csv.DictReader(f))
+    assert len(rows) == len({1.0, 1.2, gm.SHRINKAGE_ALPHA})
+    best = rows[0]
+    assert float(best["shrinkage_alpha"]) == pytest.approx(gm.SHRINKAGE_ALPHA)
+    assert float(best["agreement"]) == 1.0
+    assert float(best["mean_abs_dev"]) == 0.0
+    assert "parameter sets" in capsys.readouterr().out
@@ -0,0 +1,40 @@
+"""synth_markets: deterministic fixtures whose book kinds reach the grader
+paths they are named for."""
+
+import numpy as np
+
+import grade_markets as gm
+import synth_markets
+
+
+def books(kind, n=5000, seed=0):
+    rng = np.random.default_rng(seed)
+    cols = synth_markets.generate_books(rng.uniform(0, 1, n), rng.random(n) < 0.5, {kind: 1.0}, rng)
+    return cols["yes_bid"], cols["yes_ask"], cols["last_price"]
+
+
+def test_stale_books_are_quoted_with_the_last_print_outside():
+    bid, ask, last = books("stale")
+    assert ((bid > 0) & (ask > 0) & (bid < ask)).all()
+    assert ((last < bid) | (last > ask)).all()
+    assert ((last >= 1) & (last <= 99)).all()
+
+
+def test_stale_books_take_the_graders_stale_price():
+    """The blend falls back to the nearest quote and the minimum trade weight."""
+    bid, ask, last = books("stale", n=200)
+    n = len(bid)
+    scores = gm.score_contracts(bid, ask, last, np.full(n, 10), np.full(n, 5), np.zeros(n, dtype=int))
+    nearest = np.where(last < bid, bid, ask)
+    expected = gm.LAST_TRADE_WEIGHT_MIN * nearest + (1 - gm.LAST_TRADE_WEIGHT_MIN) * (bid + ask) / 2
+    np.testing.assert_allclose(scores["probability"], expected)
+
+
+def test_generate_is_deterministic_and_sized():
+    markets, kalshi_ids = synth_markets.generate(1000, seed=3)
+    again, _ = synth_markets.generate(1000, seed=3)
+    other, _ = synth_markets.generate(1000, seed=4)
+    assert markets == again and markets != other
+    n = sum(len(page) for page in markets.values())
+    assert 1000 <= n < 1010
+    assert set(markets) == set(kalshi_ids["event_ticker"])